@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the async dashboard, analytics and budget pages (tracker.async_views)
+os.environ.setdefault('MONEYMAP_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -22,10 +23,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-*q^14vke&6egb@+u0xklnde8!!d&@24xd95zt^wwq$pr9j%a)^'
 
+# MONEYMAP_PROFILE=production turns DEBUG off, renders templates from the
+# cached loader only and, unless MONEYMAP_DB_PROFILE says otherwise, uses
+# the production database profile below.
+PROFILE = os.environ.get('MONEYMAP_PROFILE', 'development')
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = PROFILE != 'production'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('MONEYMAP_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -50,8 +56,21 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Opt-in request profiling (tracker.profiling); staff see the report at
+# /profiling/. Memory tracing slows every request down, so it is separate.
+TRACKER_PROFILING = os.environ.get('MONEYMAP_PROFILING') == '1'
+TRACKER_PROFILING_MEMORY = os.environ.get('MONEYMAP_PROFILING_MEMORY') == '1'
+TRACKER_PROFILING_WINDOW = 500
+
+if TRACKER_PROFILING:
+    MIDDLEWARE.append('tracker.profiling.ProfilingMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
+# Route the dashboard, analytics and budget pages to tracker.async_views;
+# config/asgi.py turns this on, WSGI keeps the synchronous views
+TRACKER_ASYNC_VIEWS = os.environ.get('MONEYMAP_ASYNC_VIEWS') == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -68,18 +87,103 @@ TEMPLATES = [
     },
 ]
 
+if PROFILE == 'production':
+    # Parsed once per process and never checked for changes on disk; with
+    # DEBUG off, nodes also stop recording their source for error pages
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# MONEYMAP_DB_ENGINE picks SQLite (default) or PostgreSQL; MONEYMAP_DB_PROFILE=production
+# turns on persistent connections and, for SQLite, WAL and the other PRAGMAs below.
+
+DB_ENGINE = os.environ.get('MONEYMAP_DB_ENGINE', 'sqlite')
+DB_PROFILE = os.environ.get('MONEYMAP_DB_PROFILE', PROFILE)
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'moneymap'),
+            'USER': os.environ.get('POSTGRES_USER', 'moneymap'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        }
+    }
+    # Behind PgBouncer in transaction pooling mode, server-side cursors
+    # (used by the streaming export) must be off
+    if os.environ.get('POSTGRES_POOLER') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+
+# Tuning for SQLite under concurrent workers, applied to every new
+# connection by tracker.models.configure_sqlite in the production profile
+TRACKER_SQLITE_PRODUCTION_PRAGMAS = {
+    # Readers no longer block the writer, nor the writer readers
+    'journal_mode': 'WAL',
+    # Safe with WAL: a crash can lose the last commits, never corrupt the file
+    'synchronous': 'NORMAL',
+    # Milliseconds a writer waits for the lock instead of failing with "database is locked"
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
 }
+TRACKER_SQLITE_PRAGMAS = {}
+
+if DB_PROFILE == 'production':
+    # Reuse connections across requests, checking them before reuse
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('MONEYMAP_CONN_MAX_AGE', 60))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if DB_ENGINE != 'postgresql':
+        DATABASES['default']['OPTIONS'] = {'timeout': 20}
+        TRACKER_SQLITE_PRAGMAS = TRACKER_SQLITE_PRODUCTION_PRAGMAS
+
+
+# Cache
+# Local memory by default; set MONEYMAP_CACHE=file to share the cache
+# between worker processes on one host.
+
+if os.environ.get('MONEYMAP_CACHE') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('MONEYMAP_CACHE_LOCATION', BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'moneymap',
+        }
+    }
+
+# Seconds a per-user summary stays cached; writes invalidate it sooner
+TRACKER_CACHE_TIMEOUT = 60 * 60
+
+# ExchangeRate rates are the value of one unit in this currency
+TRACKER_BASE_CURRENCY = 'USD'
+# Currencies whose rate series are kept in memory, and for how many seconds
+TRACKER_RATE_CACHE_SIZE = 32
+TRACKER_RATE_CACHE_TTL = 300
 
 
 # Password validation
@@ -124,4 +228,19 @@ LOGIN_URL = 'login'
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATIC_ROOT = BASE_DIR / 'staticfiles'
\ No newline at end of file
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Background job inputs and results (tracker.jobs). They are never served
+# directly; downloads go through the owner-only job views.
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Exports with more rows, and imports with larger files, are queued as
+# background jobs for `manage.py run_worker` instead of running in the
+# request; None keeps every export in the request. The worker needs a cache
+# shared with the web processes (MONEYMAP_CACHE=file) to evict stale totals.
+TRACKER_EXPORT_INLINE_ROWS = 10000
+TRACKER_IMPORT_INLINE_BYTES = 1024 * 1024
+# Finished jobs' files are deleted by the worker after this many days
+TRACKER_JOB_FILE_DAYS = 7
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,202 @@
+import hashlib
+from datetime import MAXYEAR, MINYEAR, date
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import condition, require_GET
+
+from .balances import ZERO, balance_as_of, balance_series
+from .cache import cached_budget_progress, cached_profile, cached_summary
+from .models import Transaction, UserProfile
+from .pagination import KeysetPage
+from .search import ranked
+from .services import MAX_SERIES_PERIODS, SERIES_GRANULARITIES, filter_transactions, get_series
+
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 500
+MAX_BALANCE_DAYS = 3660
+TRANSACTION_FIELDS = ('id', 'title', 'amount', 'currency', 'category_id', 'category__name', 'transaction_type', 'date', 'description')
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def user_etag(request, *args, **kwargs):
+    """
+    ETag for a GET on the user's data: their data version, today's date and
+    the exact URL. Costs one primary-key lookup, so an unchanged poll is
+    answered with 304 Not Modified before the view does any work.
+
+    The date is there because the month, series and balance endpoints
+    default to the current period, which moves on without any write.
+    """
+    version = UserProfile.objects.filter(user=request.user).values_list('data_version', flat=True).first()
+    digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()[:16]
+    return f'{request.user.pk}-{version}-{timezone.localdate().isoformat()}-{digest}'
+
+
+def api_view(view):
+    """Read-only, authenticated JSON endpoint with conditional GET support."""
+    return api_login_required(require_GET(condition(etag_func=user_etag)(view)))
+
+
+def _int_param(request, name, default, minimum, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        value = default
+    return min(max(value, minimum), maximum)
+
+
+def _transaction_json(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'amount': row['amount'],
+        'currency': row['currency'],
+        'category': {'id': row['category_id'], 'name': row['category__name']} if row['category_id'] else None,
+        'type': row['transaction_type'],
+        'date': row['date'],
+        'description': row['description'],
+    }
+
+
+def _date_param(request, name, default):
+    try:
+        return date.fromisoformat(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _month_params(request):
+    # The same day user_etag() keys on
+    today = timezone.localdate()
+    # The month and the ones either side of it must be real dates, as in views.selected_month()
+    year = _int_param(request, 'year', today.year, MINYEAR + 1, MAXYEAR - 1)
+    month = _int_param(request, 'month', today.month, 1, 12)
+    return year, month
+
+
+@api_view
+def transactions(request):
+    per_page = _int_param(request, 'limit', API_PAGE_SIZE, 1, MAX_API_PAGE_SIZE)
+    queryset = filter_transactions(
+        Transaction.objects.filter(user=request.user), request.GET, request.user.id
+    ).values(*TRANSACTION_FIELDS)
+    page = KeysetPage(queryset, request.GET.get('cursor'), request.GET.get('before'), per_page)
+
+    return JsonResponse({
+        'results': [_transaction_json(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@api_view
+def search(request):
+    """Best matches for ``?q=`` first; the other list filters still apply."""
+    text = request.GET.get('q', '').strip()
+    if not text:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    limit = _int_param(request, 'limit', API_PAGE_SIZE, 1, MAX_API_PAGE_SIZE)
+    params = request.GET.copy()
+    params.pop('search', None)
+    queryset = filter_transactions(Transaction.objects.filter(user=request.user), params)
+    rows = ranked(queryset, text, request.user.id).values(*TRANSACTION_FIELDS)[:limit]
+    return JsonResponse({'results': [_transaction_json(row) for row in rows]})
+
+
+@api_view
+def summary(request):
+    year, month = _month_params(request)
+    data = cached_summary(request.user, year, month)
+    profile = cached_profile(request.user)
+
+    return JsonResponse({
+        'year': year,
+        'month': month,
+        'currency': profile.currency,
+        'monthly_income': profile.monthly_income,
+        'total_income': data['total_income'],
+        'total_expense': data['total_expense'],
+        'month_income': data['month_income'],
+        'month_expense': data['month_expense'],
+        'balance': profile.monthly_income - data['month_expense'],
+        'category_breakdown': [
+            {'category_id': item['category_id'], 'name': item['category__name'], 'total': item['total']}
+            for item in data['category_breakdown']
+        ],
+    })
+
+
+@api_view
+def series(request):
+    granularity = request.GET.get('granularity', 'month')
+    if granularity not in SERIES_GRANULARITIES:
+        return JsonResponse({'error': f"granularity must be one of {', '.join(SERIES_GRANULARITIES)}"}, status=400)
+    periods = _int_param(request, 'periods', 6, 1, MAX_SERIES_PERIODS)
+
+    points = get_series(request.user, periods, granularity)
+    return JsonResponse({
+        'granularity': granularity,
+        'results': [
+            {'period': point['period'], 'label': point['label'], 'income': point['income'], 'expense': point['expense']}
+            for point in points
+        ],
+    })
+
+
+@api_view
+def budget(request):
+    year, month = _month_params(request)
+    progress = cached_budget_progress(request.user, year, month)
+
+    return JsonResponse({
+        'year': year,
+        'month': month,
+        'results': [
+            {
+                'goal_id': item['goal'].pk,
+                'category_id': item['goal'].category_id,
+                'category': item['goal'].category.name,
+                'monthly_limit': item['goal'].monthly_limit,
+                'spent': item['spent'],
+                'remaining': item['remaining'],
+                'percentage': item['percentage'],
+            }
+            for item in progress
+        ],
+    })
+
+
+@api_view
+def balance(request):
+    """
+    Balance as of ``?date=`` (default today) from the daily ledger; with
+    ``?start=`` also one point per day from there to ``date``.
+    """
+    end = _date_param(request, 'date', timezone.localdate())
+    row = balance_as_of(request.user, end)
+    data = {
+        'date': end,
+        'currency': cached_profile(request.user).currency,
+        'balance': row.balance if row else ZERO,
+        'income': row.running_income if row else ZERO,
+        'expense': row.running_expense if row else ZERO,
+    }
+    start = _date_param(request, 'start', None)
+    if start is not None:
+        earliest = date.fromordinal(max(end.toordinal() - (MAX_BALANCE_DAYS - 1), 1))
+        start = min(max(start, earliest), end)
+        data['results'] = [
+            {'date': day, 'balance': value} for day, value in balance_series(request.user, start, end)
+        ]
+    return JsonResponse(data)
@@ -0,0 +1,106 @@
+"""
+Async versions of the read-heavy pages, served in place of the views in
+views.py when TRACKER_ASYNC_VIEWS is on (the default under config.asgi).
+
+Each view starts its independent reads together with asyncio.gather
+instead of one after another, and awaits the database and cache rather
+than holding a worker thread, so a single ASGI worker can keep many slow
+client connections open. Contexts and templates are shared with the
+synchronous views.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+from django.utils import timezone
+
+from .balances import running_balance
+from .cache import (
+    acached_budget_progress, acached_month_summaries, acached_profile, acached_summary, afragment_versions,
+)
+from .models import Category
+from .pagination import KeysetPage
+from .services import aapproximate_count, aget_series
+from .views import (
+    analytics_context, analytics_options, budget_goals_context, convert_foreign_amounts, dashboard_context,
+    dashboard_transactions, month_forecasts, selected_month,
+)
+
+
+def async_login_required(view):
+    """login_required for ``async def`` views, which Django 5.0's decorator cannot wrap."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Loaded once here so templates and helpers never hit the lazy request.user
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _all(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _render(request, template_name, context):
+    # Template rendering is synchronous (context processors, lazy attributes)
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@async_login_required
+async def dashboard(request):
+    user = request.user
+    current_year, current_month = selected_month(request)
+    # Before the data, as in views.dashboard
+    fragments = await afragment_versions(user)
+
+    summary, profile, transactions, total_count, forecasts = await asyncio.gather(
+        acached_summary(user, current_year, current_month),
+        acached_profile(user),
+        KeysetPage.afetch(
+            dashboard_transactions(request, user),
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            per_page=10,
+            annotations={'running_balance': running_balance()},
+        ),
+        aapproximate_count(user, request.GET),
+        _all(month_forecasts(user, current_year, current_month)),
+    )
+    if any(item.currency and item.currency != profile.currency for item in transactions):
+        await sync_to_async(convert_foreign_amounts)(transactions, profile.currency)
+
+    # Left lazy: rendering runs in a thread, and skips it on a fragment cache hit
+    categories = Category.objects.filter(user=user)
+    context = dashboard_context(request, summary, profile, transactions, total_count, categories, fragments, forecasts)
+    return await _render(request, 'tracker/dashboard.html', context)
+
+
+@async_login_required
+async def analytics(request):
+    now = timezone.now()
+    granularity, periods = analytics_options(request)
+
+    series, summaries = await asyncio.gather(
+        aget_series(request.user, periods, granularity),
+        acached_month_summaries(request.user, [(now.year, now.month)]),
+    )
+
+    context = analytics_context(series, summaries[(now.year, now.month)], granularity, periods)
+    return await _render(request, 'tracker/analytics.html', context)
+
+
+@async_login_required
+async def budget_goals(request):
+    current_year, current_month = selected_month(request)
+    fragments = await afragment_versions(request.user)
+
+    goals_with_spending = await acached_budget_progress(request.user, current_year, current_month)
+    categories = Category.objects.filter(user=request.user, category_type='expense')
+
+    context = budget_goals_context(request, goals_with_spending, categories, fragments)
+    return await _render(request, 'tracker/budget_goals.html', context)
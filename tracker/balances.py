@@ -0,0 +1,236 @@
+"""
+The DailyBalance ledger: one row per user and day with transactions,
+holding that day's income and expense plus the running totals and
+balance up to and including it.
+
+A change on day D leaves the earlier rows alone. D's own row is
+recomputed, and every later row shifts by D's change, in one UPDATE. A
+back-dated edit therefore costs one statement over the suffix of the
+ledger rather than a pass over the user's history.
+
+running_balance() extends the ledger to single transactions: the
+balance at the end of the previous day with activity, plus that day's
+transactions up to this one.
+"""
+import threading
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, Round
+
+from .currency import MONEY, converted_amount
+from .models import DailyBalance, Transaction
+
+ZERO = Decimal('0')
+
+_pending = threading.local()
+
+# SQLite caps the number of bound parameters per statement
+_DATE_CHUNK = 500
+
+
+def _day_totals(queryset):
+    amount = converted_amount()
+    return queryset.values('user_id', 'date').annotate(
+        income=Sum(amount, filter=Q(transaction_type='income')),
+        expense=Sum(amount, filter=Q(transaction_type='expense')),
+    ).order_by('user_id', 'date')
+
+
+def _running_rows(rows):
+    # Yields DailyBalance objects from day totals ordered by user and date
+    user_id = None
+    for row in rows:
+        if row['user_id'] != user_id:
+            user_id = row['user_id']
+            running_income = running_expense = ZERO
+        income = row['income'] or ZERO
+        expense = row['expense'] or ZERO
+        running_income += income
+        running_expense += expense
+        yield DailyBalance(
+            user_id=user_id,
+            date=row['date'],
+            income=income,
+            expense=expense,
+            running_income=running_income,
+            running_expense=running_expense,
+            balance=running_income - running_expense,
+        )
+
+
+def refresh_days(user_id, dates):
+    """Bring the ledger of ``user_id`` up to date after changes on ``dates``."""
+    dates = sorted(set(dates))
+    fresh = {}
+    for i in range(0, len(dates), _DATE_CHUNK):
+        chunk = dates[i:i + _DATE_CHUNK]
+        for row in _day_totals(Transaction.objects.filter(user_id=user_id, date__in=chunk)):
+            fresh[row['date']] = (row['income'] or ZERO, row['expense'] or ZERO)
+
+    with transaction.atomic():
+        ledger = DailyBalance.objects.filter(user_id=user_id)
+        stored = {}
+        for i in range(0, len(dates), _DATE_CHUNK):
+            for row in ledger.filter(date__in=dates[i:i + _DATE_CHUNK]):
+                stored[row.date] = row
+
+        # Ascending, so the rows before each day are already correct
+        for day in dates:
+            income, expense = fresh.get(day, (ZERO, ZERO))
+            row = stored.get(day)
+            old_income, old_expense = (row.income, row.expense) if row else (ZERO, ZERO)
+            delta_income, delta_expense = income - old_income, expense - old_expense
+            if (row is not None) == (day in fresh) and not delta_income and not delta_expense:
+                continue
+
+            if day not in fresh:
+                row.delete()
+            else:
+                before = ledger.filter(date__lt=day).order_by('-date').values(
+                    'running_income', 'running_expense'
+                ).first() or {'running_income': ZERO, 'running_expense': ZERO}
+                running_income = before['running_income'] + income
+                running_expense = before['running_expense'] + expense
+                DailyBalance.objects.update_or_create(user_id=user_id, date=day, defaults={
+                    'income': income,
+                    'expense': expense,
+                    'running_income': running_income,
+                    'running_expense': running_expense,
+                    'balance': running_income - running_expense,
+                })
+            ledger.filter(date__gt=day).update(
+                running_income=F('running_income') + delta_income,
+                running_expense=F('running_expense') + delta_expense,
+                balance=F('balance') + delta_income - delta_expense,
+            )
+
+
+def schedule_refresh(user_id, dates):
+    """
+    Queue a ledger refresh for ``dates`` of ``user_id`` that runs once the
+    current database transaction commits, as tracker.rollups does.
+    """
+    if not hasattr(_pending, 'dates'):
+        _pending.dates = {}
+    _pending.dates.setdefault(user_id, set()).update(dates)
+    transaction.on_commit(run_pending)
+
+
+def run_pending():
+    """Run the queued refreshes now, as tracker.rollups.run_pending() does."""
+    pending = getattr(_pending, 'dates', {})
+    _pending.dates = {}
+    for user_id, dates in pending.items():
+        refresh_days(user_id, dates)
+
+
+def rebuild_balances(users=None, batch_size=1000):
+    """
+    Rebuild the ledger from scratch, either for every user or only for the
+    given user ids. Returns the number of rows written.
+    """
+    ledger = DailyBalance.objects.all()
+    transactions = Transaction.objects.all()
+    if users is not None:
+        ledger = ledger.filter(user_id__in=users)
+        transactions = transactions.filter(user_id__in=users)
+
+    written = 0
+    with transaction.atomic():
+        ledger.delete()
+        batch = []
+        for row in _running_rows(_day_totals(transactions).iterator(chunk_size=batch_size)):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                DailyBalance.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        DailyBalance.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def verify_balances(user_ids, batch_size=500):
+    """
+    Ids among ``user_ids`` whose ledger differs from their transactions,
+    checked ``batch_size`` users at a time.
+    """
+    fields = ('user_id', 'date', 'income', 'expense', 'running_income', 'running_expense', 'balance')
+    drifted = []
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        expected = {}
+        for row in _running_rows(_day_totals(Transaction.objects.filter(user_id__in=batch))):
+            expected.setdefault(row.user_id, []).append(tuple(getattr(row, field) for field in fields))
+        stored = {}
+        rows = DailyBalance.objects.filter(user_id__in=batch).order_by('user_id', 'date').values_list(*fields)
+        for row in rows:
+            stored.setdefault(row[0], []).append(row)
+        drifted += [user_id for user_id in batch if expected.get(user_id, []) != stored.get(user_id, [])]
+    return drifted
+
+
+def balance_as_of(user, day):
+    """
+    The ledger row of ``user`` for the last day with transactions on or
+    before ``day``, or ``None`` when there is none. One indexed lookup.
+    """
+    return DailyBalance.objects.filter(user=user, date__lte=day).order_by('-date').first()
+
+
+def balance_series(user, start, end):
+    """
+    ``(date, balance)`` for every day from ``start`` to ``end``, carrying
+    the balance over days without transactions. Reads one row per day
+    with transactions in the range, plus the one before it.
+    """
+    # Day arithmetic would overflow at date.min and date.max; ordinals do not
+    opening = DailyBalance.objects.filter(user=user, date__lt=start).order_by('-date').first()
+    balance = opening.balance if opening else ZERO
+    changes = dict(
+        DailyBalance.objects.filter(user=user, date__gte=start, date__lte=end).values_list('date', 'balance')
+    )
+    series = []
+    for ordinal in range(start.toordinal(), end.toordinal() + 1):
+        day = date.fromordinal(ordinal)
+        balance = changes.get(day, balance)
+        series.append((day, balance))
+    return series
+
+
+def signed_amount():
+    """converted_amount(), negated for expenses."""
+    amount = converted_amount()
+    return Case(When(transaction_type='income', then=amount), default=-amount, output_field=MONEY)
+
+
+def running_balance(window=False):
+    """
+    Expression for the owner's balance right after each transaction, in
+    their profile currency, with transactions of a day taken in id order.
+
+    The same-day part is a correlated sum over the owner's transactions by
+    default, which holds whatever the query filters out. ``window=True``
+    computes it with a window over the query's own rows instead, in the
+    same pass; that is only exact when the query holds every transaction
+    of each day it returns (no category, type or search filter).
+    """
+    opening = Subquery(
+        DailyBalance.objects.filter(user_id=OuterRef('user_id'), date__lt=OuterRef('date'))
+        .order_by('-date').values('balance')[:1],
+        output_field=MONEY,
+    )
+    if window:
+        same_day = Window(Sum(signed_amount()), partition_by=[F('user_id'), F('date')], order_by=F('id').asc())
+    else:
+        same_day = Subquery(
+            Transaction.objects.filter(user_id=OuterRef('user_id'), date=OuterRef('date'), id__lte=OuterRef('id'))
+            .order_by().values('user_id').annotate(total=Sum(signed_amount())).values('total'),
+            output_field=MONEY,
+        )
+    # Rounded because SQLite adds the decimals up as floating point
+    return Round(Coalesce(opening, Value(ZERO)) + same_day, 2, output_field=MONEY)
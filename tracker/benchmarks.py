@@ -0,0 +1,296 @@
+import asyncio
+import io
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .fakedata import EXPENSE_PATTERNS, fake_user, generate_user_data
+from .importers import import_transactions
+from .models import Category, RecurringTransaction, Transaction
+from .recurring import process_recurring
+
+DEFAULT_SIZES = (1000, 100000)
+BENCHMARK_VIEWS = ('dashboard', 'analytics', 'budget_goals', 'export_transactions')
+# Rows each daily rule creates in the recurring benchmark
+RECURRING_DAYS = 100
+HANDLER_PATHS = ('/dashboard/', '/analytics/', '/budget-goals/')
+
+
+def benchmark_user(size, seed=0):
+    """``bench_<size>``, topped up to at least ``size`` transactions."""
+    user = fake_user(f'bench_{size}')
+    missing = size - Transaction.objects.filter(user=user).count()
+    if missing > 0:
+        generate_user_data(user, transactions=missing, seed=seed)
+    return user
+
+
+def measure(func, repeat):
+    """
+    Run ``func`` ``repeat`` times against a cold cache and summarise the
+    latencies and the largest number of queries of any run.
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(ctx))
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+        'queries': queries,
+    }
+
+
+def _get(client, name):
+    response = client.get(reverse(name))
+    if response.status_code != 200:
+        raise RuntimeError(f'{name} answered {response.status_code}')
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+
+def _csv_lines(size, seed):
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    yield 'date,title,category,type,amount,description'
+    for _ in range(size):
+        name, (titles, low, high) = rng.choice(list(EXPENSE_PATTERNS.items()))
+        day = today - timedelta(days=rng.randrange(730))
+        yield f'{day.isoformat()},{rng.choice(titles)},{name},expense,{rng.randint(low, high)}.00,'
+
+
+def _rolled_back(func):
+    # Timed writes are undone so repeated runs see the same data; work
+    # deferred to on_commit (rollup refresh, cache eviction) is not included
+    def wrapper():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+    return wrapper
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, seed=0, log=None):
+    """
+    Time the main views plus the import and recurring paths at each data
+    size. Returns a JSON-serialisable report.
+    """
+    results = {}
+    for size in sizes:
+        if log:
+            log(f'Preparing {size} rows...')
+        user = benchmark_user(size, seed)
+        client = Client()
+        client.force_login(user)
+
+        cases = {}
+        # Time the export itself rather than handing it to the job queue
+        with override_settings(ALLOWED_HOSTS=['testserver'], TRACKER_EXPORT_INLINE_ROWS=None):
+            for name in BENCHMARK_VIEWS:
+                cases[name] = measure(lambda: _get(client, name), repeat)
+
+        lines = list(_csv_lines(size, seed))
+        cases['import'] = measure(_rolled_back(lambda: import_transactions(user, lines, batch_size=1000)), repeat)
+
+        def recurring():
+            today = timezone.localdate()
+            category = Category.objects.filter(user=user, category_type='expense').first()
+            RecurringTransaction.objects.bulk_create([
+                RecurringTransaction(
+                    user=user, title='Daily benchmark', amount=1, category=category, transaction_type='expense',
+                    frequency='daily', start_date=today - timedelta(days=RECURRING_DAYS - 1),
+                )
+                for _ in range(max(size // RECURRING_DAYS, 1))
+            ])
+            process_recurring(today=today, users=[user.id])
+        cases['recurring'] = measure(_rolled_back(recurring), repeat)
+
+        results[str(size)] = cases
+        if log:
+            timings = ', '.join(f"{name} {case['median_ms']:.1f}ms" for name, case in cases.items())
+            log(f'  {size} rows: {timings}')
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Compare the median latencies and query counts of ``report`` with a
+    saved ``baseline``. Returns one row per case present in both.
+    """
+    rows = []
+    for size, cases in report['results'].items():
+        for name, case in cases.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = case['median_ms'] / before['median_ms'] if before['median_ms'] else 1
+            if ratio > 1 + tolerance or case['queries'] > before['queries']:
+                status = 'regression'
+            elif ratio < 1 / (1 + tolerance):
+                status = 'improvement'
+            else:
+                status = 'unchanged'
+            rows.append({
+                'size': size,
+                'case': name,
+                'baseline_ms': before['median_ms'],
+                'median_ms': case['median_ms'],
+                'ratio': round(ratio, 3),
+                'baseline_queries': before['queries'],
+                'queries': case['queries'],
+                'status': status,
+            })
+    return rows
+
+
+def session_cookie(user):
+    """Cookie header value of a fresh logged-in session for ``user``."""
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def _throughput(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p95_ms': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 2) if latencies else None,
+    }
+
+
+def wsgi_throughput(paths, cookie, workers=8, seconds=10, client_latency=0.05):
+    """
+    Requests per second through Django's WSGI handler with ``workers``
+    threads, as in a threaded WSGI server. Each response takes the client
+    ``client_latency`` seconds to receive, during which the worker thread
+    is blocked writing it, so further connections wait for a free thread.
+    """
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + seconds
+
+    def worker(offset):
+        n = offset
+        while time.monotonic() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            }
+            status = []
+            started = time.perf_counter()
+            response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+            try:
+                for _ in response:
+                    pass
+                time.sleep(client_latency)
+            finally:
+                response.close()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not status[0].startswith('200'):
+                errors.append(status[0])
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _throughput(latencies, len(errors), time.monotonic() - started)
+
+
+async def _asgi_load(application, paths, cookie, connections, seconds, client_latency):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + seconds
+
+    async def connection(offset):
+        n = offset
+        while time.monotonic() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            received = []
+
+            async def receive():
+                if not received:
+                    received.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client stays connected; Django cancels this once it has responded
+                await asyncio.Future()
+
+            status = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(client_latency)
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status[0] != 200:
+                errors.append(status[0])
+
+    started = time.monotonic()
+    await asyncio.gather(*(connection(n) for n in range(connections)))
+    return _throughput(latencies, len(errors), time.monotonic() - started)
+
+
+def asgi_throughput(paths, cookie, connections=64, seconds=10, client_latency=0.05):
+    """
+    Requests per second through Django's ASGI handler on one event loop,
+    with ``connections`` clients each taking ``client_latency`` seconds to
+    receive a response. Waiting on a slow client does not tie up a thread.
+    """
+    from django.core.asgi import get_asgi_application
+    application = get_asgi_application()
+    return asyncio.run(_asgi_load(application, paths, cookie, connections, seconds, client_latency))
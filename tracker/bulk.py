@@ -0,0 +1,95 @@
+"""
+Bulk edits of a user's transactions: recategorize, change type and delete.
+
+A selection is either a list of ids or the dashboard's filters. Each edit
+is a single UPDATE or DELETE over it, scoped to the owner, whatever its
+size. transactions_changed is then sent once with every date the
+selection covered, and the rollup and ledger refreshes it queues run
+before the transaction commits, so totals never disagree with the rows.
+Cached pages are evicted once it has committed, as for any other write.
+"""
+from django.db import connections, transaction
+
+from . import balances, rollups
+from .models import Transaction, TransactionAnomaly, transactions_changed
+from .search import unindex
+from .services import filter_transactions
+
+# Dashboard filters that can select transactions instead of ids
+SELECTION_FILTERS = ('category', 'type', 'search', 'start', 'end')
+# Larger selections are made with a filter instead
+MAX_SELECTED_IDS = 1000
+
+
+def select_transactions(user, ids=None, params=None):
+    """
+    ``user``'s transactions with the given ``ids`` or, without ids, those
+    matching the dashboard filters in ``params``. ``None`` when neither
+    selects anything, so an empty request never means every transaction.
+    """
+    queryset = Transaction.objects.filter(user=user)
+    if ids:
+        return queryset.filter(pk__in=ids)
+    if params and any(params.get(name) for name in SELECTION_FILTERS):
+        return filter_transactions(queryset, params, user.id)
+    return None
+
+
+def _changed_dates(queryset):
+    return set(queryset.order_by().values_list('date', flat=True).distinct())
+
+
+def _changed(user_id, dates, fields):
+    transactions_changed.send(sender=Transaction, user_id=user_id, dates=dates, fields=fields)
+    rollups.run_pending()
+    balances.run_pending()
+
+
+def recategorize(user, queryset, category):
+    """Move the selection to ``category`` (``None`` for uncategorized). Returns the rows changed."""
+    queryset = queryset.exclude(category=category)
+    with transaction.atomic():
+        dates = _changed_dates(queryset)
+        updated = queryset.update(category=category)
+        if updated:
+            _changed(user.id, dates, ['category'])
+    return updated
+
+
+def change_type(user, queryset, transaction_type):
+    """Turn the selection into ``transaction_type`` rows. Returns the rows changed."""
+    queryset = queryset.exclude(transaction_type=transaction_type)
+    with transaction.atomic():
+        dates = _changed_dates(queryset)
+        updated = queryset.update(transaction_type=transaction_type)
+        if updated:
+            _changed(user.id, dates, ['transaction_type'])
+    return updated
+
+
+def _delete_rows(queryset):
+    # One DELETE over the selection, without QuerySet.delete()'s collector,
+    # which loads every row to send signals this module replaces
+    connection = connections[queryset.db]
+    subquery, params = queryset.order_by().values('pk').query.sql_with_params()
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    pk = connection.ops.quote_name(Transaction._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({subquery})', params)
+        return cursor.rowcount
+
+
+def delete_transactions(user, queryset):
+    """Delete the selection. Returns the number of transactions deleted."""
+    with transaction.atomic():
+        rows = list(queryset.order_by().values_list('id', 'date'))
+        if not rows:
+            return 0
+        # What post_delete and the cascade would do row by row. The index
+        # goes last, since a search selection is read from it.
+        TransactionAnomaly.objects.filter(transaction__in=queryset.values('id')).delete()
+        deleted = _delete_rows(queryset)
+        unindex(row[0] for row in rows)
+        # The rows left on those dates are unchanged
+        _changed(user.id, {row[1] for row in rows}, [])
+    return deleted
@@ -0,0 +1,323 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import MonthlyRollup, UserProfile
+from .services import (
+    aget_budget_progress, aget_month_summaries, aget_summary, get_budget_progress, get_month_summaries, get_summary,
+)
+
+_stats_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+_pending = threading.local()
+
+
+def _cache():
+    return caches[getattr(settings, 'TRACKER_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'TRACKER_CACHE_TIMEOUT', 60 * 60)
+
+
+def _month_key(user_id, year, month):
+    return f'tracker:month:{user_id}:{year}:{month}'
+
+
+def _totals_key(user_id):
+    return f'tracker:totals:{user_id}'
+
+
+def _profile_key(user_id):
+    return f'tracker:profile:{user_id}'
+
+
+def _goals_version_key(user_id):
+    return f'tracker:goals-version:{user_id}'
+
+
+def _budget_key(user_id, year, month, version):
+    return f'tracker:budget:{user_id}:{year}:{month}:{version}'
+
+
+def _fragment_version_key(user_id, kind):
+    return f'tracker:fragment-version:{user_id}:{kind}'
+
+
+def _new_version():
+    # Time-based so a version key that was evicted never restarts at an old value
+    return time.time_ns()
+
+
+def _count(kind, hit):
+    with _stats_lock:
+        (_hits if hit else _misses)[kind] += 1
+
+
+def cache_stats():
+    """Hit/miss counters per kind of cached value since the process started."""
+    with _stats_lock:
+        kinds = sorted(set(_hits) | set(_misses))
+        return {
+            kind: {
+                'hits': _hits[kind],
+                'misses': _misses[kind],
+                'hit_rate': _hits[kind] / (_hits[kind] + _misses[kind]),
+            }
+            for kind in kinds
+        }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _hits.clear()
+        _misses.clear()
+
+
+# Month-level aggregates are cached per (user, year, month) so that a write
+# only evicts the months it touched; totals, the profile and budget progress
+# have keys of their own.
+
+def _summary_entries(user_id, year, month, summary):
+    return {
+        _totals_key(user_id): {
+            'total_income': summary['total_income'],
+            'total_expense': summary['total_expense'],
+        },
+        _month_key(user_id, year, month): {
+            'month_income': summary['month_income'],
+            'month_expense': summary['month_expense'],
+            'category_breakdown': summary['category_breakdown'],
+        },
+    }
+
+
+def cached_summary(user, year, month):
+    """get_summary(), served from the month and totals keys when both are cached."""
+    cache = _cache()
+    month_key = _month_key(user.pk, year, month)
+    totals_key = _totals_key(user.pk)
+    cached = cache.get_many([month_key, totals_key])
+
+    if month_key in cached and totals_key in cached:
+        _count('summary', True)
+        return {**cached[totals_key], **cached[month_key]}
+
+    _count('summary', False)
+    summary = get_summary(user, year, month)
+    cache.set_many(_summary_entries(user.pk, year, month, summary), _timeout())
+    return summary
+
+
+async def acached_summary(user, year, month):
+    """Async cached_summary()."""
+    cache = _cache()
+    month_key = _month_key(user.pk, year, month)
+    totals_key = _totals_key(user.pk)
+    cached = await cache.aget_many([month_key, totals_key])
+
+    if month_key in cached and totals_key in cached:
+        _count('summary', True)
+        return {**cached[totals_key], **cached[month_key]}
+
+    _count('summary', False)
+    summary = await aget_summary(user, year, month)
+    await cache.aset_many(_summary_entries(user.pk, year, month, summary), _timeout())
+    return summary
+
+
+def _split_months(user, months, cached):
+    keys = {_month_key(user.pk, year, month): (year, month) for year, month in months}
+    summaries = {keys[key]: value for key, value in cached.items() if key in keys}
+    missing = [month for key, month in keys.items() if key not in cached]
+    with _stats_lock:
+        _hits['month'] += len(summaries)
+        _misses['month'] += len(missing)
+    return summaries, missing
+
+
+def _month_entries(user, missing, fresh):
+    return {_month_key(user.pk, year, month): fresh[(year, month)] for year, month in missing}
+
+
+def cached_month_summaries(user, months):
+    """get_month_summaries(), computing only the months missing from the cache."""
+    cache = _cache()
+    cached = cache.get_many([_month_key(user.pk, year, month) for year, month in months])
+    summaries, missing = _split_months(user, months, cached)
+
+    if missing:
+        fresh = get_month_summaries(user, missing)
+        cache.set_many(_month_entries(user, missing, fresh), _timeout())
+        summaries.update(fresh)
+    return summaries
+
+
+async def acached_month_summaries(user, months):
+    """Async cached_month_summaries()."""
+    cache = _cache()
+    cached = await cache.aget_many([_month_key(user.pk, year, month) for year, month in months])
+    summaries, missing = _split_months(user, months, cached)
+
+    if missing:
+        fresh = await aget_month_summaries(user, missing)
+        await cache.aset_many(_month_entries(user, missing, fresh), _timeout())
+        summaries.update(fresh)
+    return summaries
+
+
+def cached_budget_progress(user, year, month):
+    """get_budget_progress() for one month, keyed on the user's budget-goal version."""
+    cache = _cache()
+    version = cache.get_or_set(_goals_version_key(user.pk), _new_version, None)
+    key = _budget_key(user.pk, year, month, version)
+    progress = cache.get(key)
+    _count('budget', progress is not None)
+
+    if progress is None:
+        progress = get_budget_progress(user, year, month)
+        cache.set(key, progress, _timeout())
+    return progress
+
+
+async def acached_budget_progress(user, year, month):
+    """Async cached_budget_progress()."""
+    cache = _cache()
+    version = await cache.aget_or_set(_goals_version_key(user.pk), _new_version, None)
+    key = _budget_key(user.pk, year, month, version)
+    progress = await cache.aget(key)
+    _count('budget', progress is not None)
+
+    if progress is None:
+        progress = await aget_budget_progress(user, year, month)
+        await cache.aset(key, progress, _timeout())
+    return progress
+
+
+def cached_profile(user):
+    """The user's UserProfile without a database hit when it is cached."""
+    cache = _cache()
+    key = _profile_key(user.pk)
+    profile = cache.get(key)
+    _count('profile', profile is not None)
+
+    if profile is None:
+        profile = UserProfile.objects.get(user=user)
+        cache.set(key, profile, _timeout())
+    return profile
+
+
+async def acached_profile(user):
+    """Async cached_profile()."""
+    cache = _cache()
+    key = _profile_key(user.pk)
+    profile = await cache.aget(key)
+    _count('profile', profile is not None)
+
+    if profile is None:
+        profile = await UserProfile.objects.aget(user=user)
+        await cache.aset(key, profile, _timeout())
+    return profile
+
+
+# Template fragments ({% cache %} in the page templates) are keyed on the
+# user and on the version of each kind of data they show, so a write only
+# retires the fragments built from what it changed.
+FRAGMENT_KINDS = ('transactions', 'categories')
+
+
+def _fragment_entries(user_id, cached):
+    keys = {_fragment_version_key(user_id, kind): kind for kind in FRAGMENT_KINDS}
+    missing = {key: _new_version() for key in keys if key not in cached}
+    versions = {kind: cached.get(key, missing.get(key)) for key, kind in keys.items()}
+    return versions, missing
+
+
+def fragment_versions(user):
+    """
+    The user's current fragment version for each of FRAGMENT_KINDS, plus
+    the ``timeout`` the fragments are cached for.
+    """
+    cache = _cache()
+    cached = cache.get_many([_fragment_version_key(user.pk, kind) for kind in FRAGMENT_KINDS])
+    versions, missing = _fragment_entries(user.pk, cached)
+    _count('fragment', not missing)
+    if missing:
+        cache.set_many(missing, None)
+    return {**versions, 'timeout': _timeout()}
+
+
+async def afragment_versions(user):
+    """Async fragment_versions()."""
+    cache = _cache()
+    cached = await cache.aget_many([_fragment_version_key(user.pk, kind) for kind in FRAGMENT_KINDS])
+    versions, missing = _fragment_entries(user.pk, cached)
+    _count('fragment', not missing)
+    if missing:
+        await cache.aset_many(missing, None)
+    return {**versions, 'timeout': _timeout()}
+
+
+def invalidate_months(user_id, months):
+    """
+    Evict the month-level entries for ``months`` plus the user's totals,
+    and retire the user's transaction fragments, once the current database
+    transaction commits (after the monthly rollups have been refreshed).
+    """
+    if not hasattr(_pending, 'months'):
+        _pending.months = set()
+    _pending.months.update((user_id, year, month) for year, month in months)
+    transaction.on_commit(_run_pending)
+
+
+def _run_pending():
+    pending = getattr(_pending, 'months', set())
+    _pending.months = set()
+    if not pending:
+        return
+
+    cache = _cache()
+    keys = set()
+    versions = {}
+    for user_id, year, month in pending:
+        version = cache.get(_goals_version_key(user_id))
+        keys.add(_month_key(user_id, year, month))
+        keys.add(_totals_key(user_id))
+        if version is not None:
+            keys.add(_budget_key(user_id, year, month, version))
+        versions[_fragment_version_key(user_id, 'transactions')] = _new_version()
+    cache.delete_many(list(keys))
+    cache.set_many(versions, None)
+
+
+def invalidate_categories(user_id):
+    """
+    Evict every cached month of the user that has rollup rows, since
+    category names and assignments appear in the month breakdowns.
+    """
+    months = MonthlyRollup.objects.filter(user_id=user_id).values_list('year', 'month').distinct()
+    invalidate_months(user_id, set(months))
+    invalidate_fragments(user_id, 'categories')
+
+
+def invalidate_goals(user_id):
+    """Retire every cached budget progress entry of the user once the write commits."""
+    def bump():
+        _cache().set(_goals_version_key(user_id), _new_version(), None)
+    transaction.on_commit(bump)
+
+
+def invalidate_fragments(user_id, kind):
+    """Retire the user's cached fragments showing ``kind`` once the write commits."""
+    def bump():
+        _cache().set(_fragment_version_key(user_id, kind), _new_version(), None)
+    transaction.on_commit(bump)
+
+
+def invalidate_profile(user_id):
+    transaction.on_commit(lambda: _cache().delete(_profile_key(user_id)))
@@ -0,0 +1,166 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.db.models.lookups import Exact
+
+from .models import ExchangeRate, Transaction, UserProfile, bump_data_version
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+RATE = DecimalField(max_digits=20, decimal_places=10)
+ONE = Value(Decimal('1'), output_field=RATE)
+
+
+def base_currency():
+    """Currency that ExchangeRate.rate values are quoted in."""
+    return getattr(settings, 'TRACKER_BASE_CURRENCY', 'USD')
+
+
+def _latest_rate(currency, day):
+    # Latest rate on or before ``day``; NULL when none has been loaded
+    return Subquery(
+        ExchangeRate.objects.filter(currency=currency, date__lte=day).order_by('-date').values('rate')[:1],
+        output_field=RATE,
+    )
+
+
+def converted_amount():
+    """
+    Expression converting a Transaction row's amount into its owner's
+    profile currency at the rate in effect on the transaction date, so
+    sums over mixed-currency rows happen inside the aggregate query.
+
+    Rows in the profile currency (blank ``currency`` included) pass
+    straight through without any rate lookup. Rows whose rates have not
+    been loaded are left unconverted.
+    """
+    base = base_currency()
+    owner_currency = Subquery(UserProfile.objects.filter(user_id=OuterRef('user_id')).values('currency')[:1])
+    rate_from = Case(
+        When(currency=base, then=ONE),
+        default=_latest_rate(OuterRef('currency'), OuterRef('date')),
+    )
+    # One level deeper: the profile lookup sits inside the rate subquery
+    rate_to = Case(
+        When(Exact(owner_currency, base), then=ONE),
+        default=_latest_rate(
+            Subquery(UserProfile.objects.filter(user_id=OuterRef(OuterRef('user_id'))).values('currency')[:1]),
+            OuterRef('date'),
+        ),
+    )
+    return Case(
+        When(Q(currency='') | Q(currency=owner_currency), then=F('amount')),
+        default=Coalesce(Round(F('amount') * rate_from / rate_to, 2), F('amount')),
+        output_field=MONEY,
+    )
+
+
+class RateTable:
+    """
+    In-process exchange rates, indexed by date per currency.
+
+    Each currency's full series is loaded on first use and looked up by
+    bisection. At most ``maxsize`` series are kept, least recently used
+    first out, and a series is reloaded after ``ttl`` seconds so rates
+    loaded by another process show up.
+    """
+    def __init__(self, maxsize=32, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_series(self, currency):
+        with self._lock:
+            entry = self._series.get(currency)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._series.move_to_end(currency)
+                return entry[1], entry[2]
+
+        rows = list(ExchangeRate.objects.filter(currency=currency).order_by('date').values_list('date', 'rate'))
+        dates = [day for day, rate in rows]
+        rates = [rate for day, rate in rows]
+        with self._lock:
+            self._series[currency] = (time.monotonic(), dates, rates)
+            self._series.move_to_end(currency)
+            while len(self._series) > self.maxsize:
+                self._series.popitem(last=False)
+        return dates, rates
+
+    def rate(self, currency, day):
+        """Value of one unit of ``currency`` in the base currency on ``day``, or ``None``."""
+        if currency == base_currency():
+            return Decimal('1')
+        dates, rates = self._get_series(currency)
+        index = bisect_right(dates, day) - 1
+        return rates[index] if index >= 0 else None
+
+    def convert(self, amount, currency, target, day):
+        """
+        ``amount`` in ``currency`` expressed in ``target`` on ``day``; the
+        amount is returned unchanged when a rate is missing, as in
+        converted_amount().
+        """
+        if not currency or currency == target:
+            return amount
+        rate_from = self.rate(currency, day)
+        rate_to = self.rate(target, day)
+        if rate_from is None or not rate_to:
+            return amount
+        return (amount * rate_from / rate_to).quantize(Decimal('0.01'))
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+rates = RateTable(
+    maxsize=getattr(settings, 'TRACKER_RATE_CACHE_SIZE', 32),
+    ttl=getattr(settings, 'TRACKER_RATE_CACHE_TTL', 300),
+)
+
+
+def load_rates(rows, batch_size=1000):
+    """
+    Insert or update ExchangeRate rows from (date, currency, rate) tuples.
+
+    Rollups and balance ledgers of users with foreign-currency transactions
+    on or after the earliest loaded date are rebuilt, since their converted
+    totals move. Returns ``(rates_written, users_refreshed)``.
+    """
+    from .balances import rebuild_balances
+    from .cache import invalidate_categories
+    from .rollups import rebuild_rollups
+
+    objects = [ExchangeRate(date=day, currency=currency.upper(), rate=rate) for day, currency, rate in rows]
+    if not objects:
+        return 0, 0
+
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create(
+            objects,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['currency', 'date'],
+            update_fields=['rate'],
+        )
+        earliest = min(rate.date for rate in objects)
+        users = list(
+            Transaction.objects.exclude(currency='').filter(date__gte=earliest)
+            .values_list('user_id', flat=True).order_by().distinct()
+        )
+        if users:
+            rebuild_rollups(users=users)
+            rebuild_balances(users=users)
+        for user_id in users:
+            invalidate_categories(user_id)
+            bump_data_version(user_id)
+
+    rates.clear()
+    return len(objects), len(users)
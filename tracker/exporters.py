@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from .balances import running_balance
+from .models import Transaction
+from .services import filter_transactions
+
+EXPORT_HEADER = ['Date', 'Title', 'Category', 'Type', 'Amount', 'Description', 'Currency', 'Balance']
+# Filters that drop some of a day's transactions
+PARTIAL_DAY_FILTERS = ('category', 'type', 'search')
+EXPORT_CHUNK_SIZE = 2000
+CENT = Decimal('0.01')
+
+
+def export_rows(user, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    CSV rows, header first, of ``user``'s transactions matching
+    filter_transactions(params), newest first.
+
+    Categories are joined in the one query and rows are fetched in chunks
+    of ``chunk_size``, so memory stays flat regardless of history size.
+    The balance after each row comes from running_balance(); exports that
+    hold whole days sum each day with a window in the same pass.
+    """
+    whole_days = not any(params.get(name) for name in PARTIAL_DAY_FILTERS)
+    transactions = filter_transactions(
+        Transaction.objects.filter(user=user).order_by('-date', '-id'),
+        params,
+        user.id,
+    ).annotate(balance=running_balance(window=whole_days)).values_list(
+        'date', 'title', 'category__name', 'transaction_type', 'amount', 'description', 'currency', 'balance'
+    )
+
+    yield EXPORT_HEADER
+    for date, title, category_name, transaction_type, amount, description, currency, balance in (
+        transactions.iterator(chunk_size=chunk_size)
+    ):
+        yield [
+            date.strftime('%Y-%m-%d'),
+            title,
+            category_name or 'Uncategorized',
+            transaction_type.capitalize(),
+            amount,
+            description,
+            currency,
+            balance.quantize(CENT),
+        ]
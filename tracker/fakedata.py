@@ -0,0 +1,137 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_goals
+from .models import (
+    BudgetGoal, Category, RecurringTransaction, Transaction, UserProfile, bump_data_version, transactions_changed,
+)
+
+# Titles and a typical amount range per default category
+EXPENSE_PATTERNS = {
+    'Food & Dining': (['Lunch', 'Dinner out', 'Coffee', 'Pizza night', 'Breakfast'], 80, 1500),
+    'Transportation': (['Fuel', 'Metro card', 'Taxi', 'Bus pass', 'Parking'], 30, 2500),
+    'Shopping': (['Clothes', 'Shoes', 'Electronics', 'Home decor', 'Books'], 200, 8000),
+    'Entertainment': (['Movie tickets', 'Concert', 'Streaming subscription', 'Games'], 150, 3000),
+    'Bills & Utilities': (['Electricity bill', 'Water bill', 'Internet', 'Mobile recharge'], 300, 4000),
+    'Healthcare': (['Pharmacy', 'Doctor visit', 'Lab tests', 'Dental checkup'], 200, 6000),
+    'Education': (['Online course', 'Textbooks', 'Tuition fee', 'Workshop'], 500, 15000),
+    'Rent': (['Monthly rent'], 8000, 30000),
+    'Groceries': (['Supermarket', 'Vegetables', 'Milk and bread', 'Weekly groceries'], 100, 5000),
+    'Other Expense': (['Miscellaneous', 'Gift for friend', 'Donation', 'Repairs'], 50, 5000),
+}
+INCOME_PATTERNS = {
+    'Salary': (['Monthly salary'], 30000, 120000),
+    'Freelance': (['Freelance project', 'Consulting', 'Design work'], 2000, 40000),
+    'Investment Returns': (['Dividend', 'Interest', 'Mutual fund returns'], 100, 10000),
+    'Business': (['Business income', 'Sales'], 5000, 50000),
+    'Gift': (['Birthday gift', 'Cash gift'], 500, 10000),
+    'Other Income': (['Refund', 'Cashback', 'Sold old items'], 50, 5000),
+}
+DESCRIPTIONS = ['', '', '', 'paid by card', 'paid in cash', 'shared with friends', 'monthly', 'online order']
+
+# Share of generated transactions that are income
+INCOME_SHARE = 0.1
+
+
+def _amount(rng, low, high):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def generate_user_data(user, transactions=1000, days=730, categories=0, budgets=5, recurring=5,
+                       seed=None, batch_size=5000):
+    """
+    Add realistic-looking data for ``user``: ``categories`` extra custom
+    categories, ``transactions`` transactions spread over the last
+    ``days`` days, up to ``budgets`` budget goals and ``recurring``
+    recurring rules.
+
+    Rows are written with bulk_create inside one database transaction and
+    listeners are notified once, like an import. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        Category.objects.bulk_create([
+            Category(user=user, name=f'Custom {n + 1}', category_type=rng.choice(['expense', 'expense', 'income']))
+            for n in range(Category.objects.filter(user=user, name__startswith='Custom ').count(), categories)
+        ])
+        patterns = {'income': [], 'expense': []}
+        for category in Category.objects.filter(user=user):
+            known = INCOME_PATTERNS if category.category_type == 'income' else EXPENSE_PATTERNS
+            titles, low, high = known.get(category.name, ([category.name], 100, 3000))
+            patterns[category.category_type].append((category.id, titles, low, high))
+
+        created = 0
+        dates = set()
+        batch = []
+        for _ in range(transactions):
+            transaction_type = 'income' if rng.random() < INCOME_SHARE and patterns['income'] else 'expense'
+            category_id, titles, low, high = rng.choice(patterns[transaction_type])
+            day = today - timedelta(days=rng.randrange(days))
+            batch.append(Transaction(
+                user=user,
+                title=rng.choice(titles),
+                amount=_amount(rng, low, high),
+                category_id=category_id,
+                transaction_type=transaction_type,
+                date=day,
+                description=rng.choice(DESCRIPTIONS),
+            ))
+            dates.add(day)
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        created += len(batch)
+
+        goal_categories = set(BudgetGoal.objects.filter(user=user).values_list('category_id', flat=True))
+        candidates = [row for row in patterns['expense'] if row[0] not in goal_categories]
+        goals = BudgetGoal.objects.bulk_create([
+            BudgetGoal(user=user, category_id=category_id, monthly_limit=_amount(rng, high, high * 4))
+            for category_id, titles, low, high in rng.sample(candidates, min(budgets, len(candidates)))
+        ])
+
+        rules = []
+        for _ in range(recurring):
+            transaction_type = 'income' if rng.random() < 0.3 and patterns['income'] else 'expense'
+            category_id, titles, low, high = rng.choice(patterns[transaction_type])
+            rules.append(RecurringTransaction(
+                user=user,
+                title=rng.choice(titles),
+                amount=_amount(rng, low, high),
+                category_id=category_id,
+                transaction_type=transaction_type,
+                frequency=rng.choice(['weekly', 'monthly', 'monthly', 'yearly']),
+                start_date=today - timedelta(days=rng.randrange(days)),
+                last_created=today,
+            ))
+        RecurringTransaction.objects.bulk_create(rules)
+
+        profile = UserProfile.objects.get(user=user)
+        if not profile.monthly_income:
+            profile.monthly_income = _amount(rng, 40000, 150000)
+            profile.save()
+
+        # bulk_create skips post_save, so notify listeners once for everything
+        if goals:
+            invalidate_goals(user.id)
+            bump_data_version(user.id)
+        if dates:
+            transactions_changed.send(sender=Transaction, user_id=user.id, dates=dates)
+
+    return {'transactions': created, 'budgets': len(goals), 'recurring': len(rules)}
+
+
+def fake_user(username, password='password'):
+    """The user called ``username``, created (with its default categories) if needed."""
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        user = User.objects.create_user(username, password=password)
+    return user
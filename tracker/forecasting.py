@@ -0,0 +1,206 @@
+"""
+Month-end spending projections and outlier flags, computed in batches.
+
+For each batch of users, one grouped query fetches per-category daily
+expense totals for the current month and the HISTORY_MONTHS before it.
+Each series is laid into a fixed-length array indexed by day, and the
+projections come from prefix sums over it. The projection for a category
+is what has been spent so far this month, plus the average of what was
+spent after the same day of the month in the previous months. That
+average is 0 for rent paid on the 1st and about a daily rate for
+groceries.
+
+Anomalies use the modified z-score (median and median absolute deviation)
+of each expense against the user's other expenses in the same category.
+It is robust to the outliers it is looking for.
+
+Results go to SpendingForecast and TransactionAnomaly, so pages read them
+with one indexed query. compute_forecasts() spreads the batches over
+worker processes.
+"""
+import multiprocessing
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, groupby
+from statistics import median
+
+import django
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .currency import converted_amount
+from .models import BudgetGoal, SpendingForecast, Transaction, TransactionAnomaly
+from .services import add_months
+
+# Previous months whose same-day remainder feeds the projection
+HISTORY_MONTHS = 3
+# Expenses compared when looking for outliers
+ANOMALY_DAYS = 180
+# Fewer expenses than this in a category is too little to call one unusual
+ANOMALY_MIN_SAMPLES = 8
+# Iglewicz and Hoaglin's cut-off for the modified z-score
+ANOMALY_THRESHOLD = 3.5
+# The series key holding a user's spending across all categories
+ALL = 'all'
+
+
+def _window_sum(prefix, start, end):
+    """Sum of the underlying series over ``[start, end)`` from its prefix sums."""
+    if end <= start:
+        return 0.0
+    return prefix[end - 1] - (prefix[start - 1] if start else 0.0)
+
+
+def _daily_series(user_ids, start, today):
+    """{(user_id, category_id or ALL): array of daily expense totals from ``start`` to ``today``}."""
+    days = (today - start).days + 1
+    series = defaultdict(lambda: array('d', bytes(8 * days)))
+    rows = Transaction.objects.filter(
+        user_id__in=user_ids, transaction_type='expense', date__gte=start, date__lte=today,
+    ).values('user_id', 'category_id', 'date').annotate(total=Sum(converted_amount())).order_by()
+    for row in rows:
+        index = (row['date'] - start).days
+        value = float(row['total'] or 0)
+        series[(row['user_id'], row['category_id'])][index] += value
+        series[(row['user_id'], ALL)][index] += value
+    return series
+
+
+def project_month(series, start, today, history_months=HISTORY_MONTHS):
+    """
+    (spent so far, projected month total) for a daily ``series`` beginning
+    at ``start``, the first day of the month ``history_months`` before
+    ``today``'s.
+    """
+    prefix = list(accumulate(series))
+    month_starts = [(add_months(start, n) - start).days for n in range(history_months + 1)]
+    current = month_starts[history_months]
+    spent = _window_sum(prefix, current, (today - start).days + 1)
+
+    remainders = []
+    for begin, end in zip(month_starts, month_starts[1:]):
+        # That month's spending after the same day of the month (clamped to its length)
+        cutoff = min(begin + today.day, end)
+        remainders.append(_window_sum(prefix, cutoff, end))
+    return spent, spent + sum(remainders) / len(remainders)
+
+
+def find_outliers(values, threshold=ANOMALY_THRESHOLD, min_samples=ANOMALY_MIN_SAMPLES):
+    """
+    ``(typical, [(index, score), ...])`` for the entries of ``values`` whose
+    modified z-score is above ``threshold``. Only unusually large amounts
+    are flagged; small samples and constant series flag nothing.
+    """
+    if len(values) < min_samples:
+        return None, []
+    typical = median(values)
+    spread = median([abs(value - typical) for value in values])
+    if not spread:
+        return typical, []
+    flagged = []
+    for index, value in enumerate(values):
+        score = 0.6745 * (value - typical) / spread
+        if score > threshold:
+            flagged.append((index, score))
+    return typical, flagged
+
+
+def _money(value):
+    return Decimal(str(round(value, 2)))
+
+
+def compute_for_users(user_ids, today=None):
+    """
+    Recompute this month's forecasts and the anomaly flags of ``user_ids``.
+    Returns ``(forecasts, anomalies)`` written.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    start = add_months(today.replace(day=1), -HISTORY_MONTHS)
+
+    forecasts = []
+    series = _daily_series(user_ids, start, today)
+    goals = BudgetGoal.objects.filter(user_id__in=user_ids).values_list('user_id', 'category_id', 'monthly_limit')
+    keys = {(user_id, category_id): limit for user_id, category_id, limit in goals}
+    keys.update({(user_id, ALL): None for user_id in {user_id for user_id, _ in series}})
+    empty = array('d', bytes(8 * ((today - start).days + 1)))
+    for (user_id, category_id), limit in keys.items():
+        spent, projected = project_month(series.get((user_id, category_id), empty), start, today)
+        forecasts.append(SpendingForecast(
+            user_id=user_id,
+            category_id=None if category_id == ALL else category_id,
+            year=today.year,
+            month=today.month,
+            spent=_money(spent),
+            projected=_money(projected),
+            budget=limit,
+            computed_at=now,
+        ))
+
+    anomalies = []
+    expenses = Transaction.objects.filter(
+        user_id__in=user_ids, transaction_type='expense', date__gt=today - timedelta(days=ANOMALY_DAYS),
+    ).annotate(value=converted_amount()).values_list('user_id', 'category_id', 'id', 'value').order_by(
+        'user_id', 'category_id'
+    )
+    for (user_id, category_id), rows in groupby(expenses.iterator(), key=lambda row: row[:2]):
+        rows = list(rows)
+        typical, flagged = find_outliers([float(row[3]) for row in rows])
+        for index, score in flagged:
+            anomalies.append(TransactionAnomaly(
+                transaction_id=rows[index][2],
+                user_id=user_id,
+                score=round(score, 2),
+                typical_amount=_money(typical),
+                computed_at=now,
+            ))
+
+    with transaction.atomic():
+        SpendingForecast.objects.filter(user_id__in=user_ids, year=today.year, month=today.month).delete()
+        SpendingForecast.objects.bulk_create(forecasts)
+        TransactionAnomaly.objects.filter(user_id__in=user_ids).delete()
+        TransactionAnomaly.objects.bulk_create(anomalies, batch_size=500)
+    return len(forecasts), len(anomalies)
+
+
+def _compute_in_process(user_ids, today):
+    try:
+        return compute_for_users(user_ids, today)
+    finally:
+        connections.close_all()
+
+
+def compute_forecasts(processes=2, batch_size=500, today=None, log=None):
+    """
+    compute_for_users() over every user, ``batch_size`` users at a time,
+    with batches spread over ``processes`` worker processes (0 runs them
+    here). Returns ``(forecasts, anomalies)`` written.
+    """
+    today = today or timezone.localdate()
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    batches = [user_ids[n:n + batch_size] for n in range(0, len(user_ids), batch_size)]
+
+    if processes == 0:
+        results = (compute_for_users(batch, today) for batch in batches)
+        return _total(results, log)
+
+    # As in tracker.jobs: spawned children must not inherit open connections
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=django.setup) as pool:
+        return _total(pool.map(_compute_in_process, batches, [today] * len(batches)), log)
+
+
+def _total(results, log):
+    forecasts = anomalies = 0
+    for number, (written, flagged) in enumerate(results, 1):
+        forecasts += written
+        anomalies += flagged
+        if log:
+            log(f'Batch {number}: {written} forecasts, {flagged} anomalies')
+    return forecasts, anomalies
@@ -1,10 +1,16 @@
 from django import forms
-from .models import Transaction, Category
+from .models import Transaction, Category, Currency
 
 class TransactionForm(forms.ModelForm):
+    currency = forms.ChoiceField(
+        required=False,
+        choices=[('', 'My currency')],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    
     class Meta:
         model = Transaction
-        fields = ['title', 'amount', 'category', 'transaction_type', 'date', 'description']
+        fields = ['title', 'amount', 'currency', 'category', 'transaction_type', 'date', 'description']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'title': forms.TextInput(attrs={'class': 'form-control'}),
@@ -13,6 +19,13 @@ class TransactionForm(forms.ModelForm):
             'transaction_type': forms.Select(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        choices = [(code, f'{code} ({symbol})') for code, symbol in Currency.objects.values_list('code', 'symbol')]
+        if self.instance.currency and self.instance.currency not in dict(choices):
+            choices.append((self.instance.currency, self.instance.currency))
+        self.fields['currency'].choices = [('', 'My currency')] + choices
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -22,3 +35,6 @@ class CategoryForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'category_type': forms.Select(attrs={'class': 'form-control'}),
         }
+
+class ImportTransactionsForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}))
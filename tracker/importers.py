@@ -0,0 +1,118 @@
+import csv
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import TransactionForm
+from .models import Category, Currency, Transaction, transactions_changed
+
+# Columns match the CSV written by export_transactions, so exports round-trip
+IMPORT_COLUMNS = ['date', 'title', 'category', 'type', 'amount', 'description', 'currency']
+OPTIONAL_COLUMNS = {'description', 'currency'}
+UNCATEGORIZED = 'uncategorized'
+
+
+def _clean_date(field, value):
+    # ISO dates are by far the common case and one of the form's input
+    # formats; skip the locale-aware format loop for them.
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return field.clean(value)
+
+
+def _category_lookup(user):
+    """Map (lower-cased name, type) and bare names to the user's category ids."""
+    by_name_and_type = {}
+    by_name = {}
+    for category_id, name, category_type in Category.objects.filter(user=user).values_list('id', 'name', 'category_type'):
+        key = name.strip().lower()
+        by_name_and_type.setdefault((key, category_type), category_id)
+        by_name.setdefault(key, category_id)
+    return by_name_and_type, by_name
+
+
+def import_transactions(user, lines, batch_size=1000):
+    """
+    Import transactions for ``user`` from an iterable of CSV lines.
+
+    Rows are validated with TransactionForm's field rules and written with
+    bulk_create in batches of ``batch_size``, all inside one database
+    transaction. Invalid rows are skipped and reported. ``lines`` decoded
+    from a file that turns out not to be UTF-8 import nothing.
+
+    Returns ``{'created': int, 'errors': [(line_number, message), ...]}``.
+    """
+    try:
+        return _import_rows(user, lines, batch_size)
+    except UnicodeDecodeError:
+        # Raised while reading, which rolled back any batch already written
+        return {'created': 0, 'errors': [(1, 'The file is not UTF-8 encoded text.')]}
+
+
+def _import_rows(user, lines, batch_size):
+    fields = TransactionForm.base_fields
+    by_name_and_type, by_name = _category_lookup(user)
+    # TransactionForm offers the configured currencies; rows in any other
+    # could never be converted
+    currencies = set(Currency.objects.values_list('code', flat=True))
+
+    reader = csv.DictReader(lines)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in IMPORT_COLUMNS if column not in reader.fieldnames and column not in OPTIONAL_COLUMNS]
+    if missing:
+        return {'created': 0, 'errors': [(1, f"Missing column(s): {', '.join(missing)}")]}
+
+    created = 0
+    errors = []
+    dates = set()
+    batch = []
+
+    with transaction.atomic():
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                transaction_type = fields['transaction_type'].clean((row.get('type') or '').strip().lower())
+                values = {
+                    'title': fields['title'].clean((row.get('title') or '').strip()),
+                    'amount': fields['amount'].clean((row.get('amount') or '').strip()),
+                    'date': _clean_date(fields['date'], (row.get('date') or '').strip()),
+                    'description': fields['description'].clean(row.get('description') or ''),
+                }
+            except ValidationError as e:
+                errors.append((line_number, '; '.join(e.messages)))
+                continue
+
+            currency = (row.get('currency') or '').strip().upper()
+            if currency and currency not in currencies:
+                errors.append((line_number, f"Unknown currency: {row.get('currency')!r}"))
+                continue
+
+            category_name = (row.get('category') or '').strip().lower()
+            category_id = by_name_and_type.get((category_name, transaction_type), by_name.get(category_name))
+            if category_id is None and category_name != UNCATEGORIZED:
+                errors.append((line_number, f"Unknown category: {row.get('category')!r}"))
+                continue
+
+            batch.append(Transaction(
+                user=user,
+                category_id=category_id,
+                transaction_type=transaction_type,
+                currency=currency,
+                **values
+            ))
+            dates.add(values['date'])
+
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        Transaction.objects.bulk_create(batch)
+        created += len(batch)
+
+        # bulk_create skips post_save, so notify listeners once for the whole import
+        if dates:
+            transactions_changed.send(sender=Transaction, user_id=user.id, dates=dates)
+
+    return {'created': created, 'errors': errors}
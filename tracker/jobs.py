@@ -0,0 +1,206 @@
+"""
+A small database-backed job queue for work too large for a request.
+
+Views call enqueue(); `manage.py run_worker` claims queued jobs in
+creation order and runs them in a process pool. Claiming is a
+conditional UPDATE from 'queued' to 'running', so several workers can
+share one queue without a broker or row locks.
+
+An import's uploaded file is deleted once the job finishes; export
+results are kept for TRACKER_JOB_FILE_DAYS days, then removed by the
+worker.
+"""
+import csv
+import io
+import logging
+import multiprocessing
+import tempfile
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files import File
+from django.db import connections
+from django.utils import timezone
+
+from .balances import rebuild_balances
+from .cache import invalidate_categories
+from .exporters import export_rows
+from .importers import import_transactions
+from .models import Job, bump_data_version
+from .rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+# Errors kept on a finished import job, for display
+MAX_REPORTED_ERRORS = 50
+# Seconds between the worker's sweeps for expired job files
+EXPIRE_INTERVAL = 3600
+
+
+def enqueue(user, kind, params=None, input_file=None):
+    """Queue a ``kind`` job for ``user``; ``input_file`` is an uploaded file to store with it."""
+    job = Job(user=user, kind=kind, params=params or {})
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    return job
+
+
+def _export(job):
+    with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        rows = 0
+        # The header is row 0
+        for rows, row in enumerate(export_rows(job.user, job.params)):
+            writer.writerow(row)
+        f.seek(0)
+        job.result_file.save(f'moneymap_transactions_{job.pk}.csv', File(f.buffer), save=False)
+    return {'rows': rows}
+
+
+def _import(job):
+    with job.input_file.open('rb') as f:
+        lines = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+        result = import_transactions(job.user, lines, batch_size=IMPORT_BATCH_SIZE)
+    return {
+        'created': result['created'],
+        'error_count': len(result['errors']),
+        'errors': result['errors'][:MAX_REPORTED_ERRORS],
+    }
+
+
+def _rebuild_rollups(job):
+    written = rebuild_rollups(users=[job.user_id]) + rebuild_balances(users=[job.user_id])
+    invalidate_categories(job.user_id)
+    bump_data_version(job.user_id)
+    return {'rows': written}
+
+
+HANDLERS = {
+    'export': _export,
+    'import': _import,
+    'rebuild_rollups': _rebuild_rollups,
+}
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return its id, or ``None`` if there is none."""
+    queued = Job.objects.filter(status='queued').order_by('created_at', 'id').values_list('id', flat=True)
+    for job_id in queued[:10]:
+        # Another worker may have taken it since the SELECT
+        if Job.objects.filter(id=job_id, status='queued').update(status='running', started_at=timezone.now()):
+            return job_id
+    return None
+
+
+def run_job(job_id):
+    """Run a claimed job and record its result or error. Returns the final status."""
+    job = Job.objects.select_related('user').get(id=job_id)
+    try:
+        job.result = HANDLERS[job.kind](job)
+        job.status = 'done'
+    except Exception:
+        logger.exception('Job %s failed', job_id)
+        job.status = 'failed'
+        job.error = traceback.format_exc(limit=5)
+    job.finished_at = timezone.now()
+    if job.input_file:
+        job.input_file.delete(save=False)
+    job.save(update_fields=['status', 'result', 'input_file', 'result_file', 'error', 'finished_at'])
+    return job.status
+
+
+def expire_files():
+    """
+    Delete the files of jobs that finished more than TRACKER_JOB_FILE_DAYS
+    days ago. Returns the number of jobs whose files were removed.
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'TRACKER_JOB_FILE_DAYS', 7))
+    expired = Job.objects.filter(finished_at__lt=cutoff).exclude(input_file='', result_file='')
+    count = 0
+    for job in expired.iterator():
+        for field in (job.input_file, job.result_file):
+            if field:
+                field.delete(save=False)
+        Job.objects.filter(pk=job.pk).update(input_file='', result_file='')
+        count += 1
+    return count
+
+
+def _run_in_process(job_id):
+    try:
+        return run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def work(processes=2, poll_interval=1.0, once=False, log=None):
+    """
+    Claim and run jobs with up to ``processes`` running at a time, polling
+    for new ones every ``poll_interval`` seconds. With ``once``, return when
+    the queue is empty; ``processes=0`` runs jobs in this process.
+    Returns the number of jobs run. Expired job files are swept whenever
+    the queue runs empty, at most every EXPIRE_INTERVAL seconds.
+    """
+    next_sweep = 0
+
+    def sweep():
+        nonlocal next_sweep
+        if time.monotonic() >= next_sweep:
+            expired = expire_files()
+            if expired and log:
+                log(f'Removed the files of {expired} expired jobs')
+            next_sweep = time.monotonic() + EXPIRE_INTERVAL
+
+    if processes == 0:
+        count = 0
+        while True:
+            job_id = claim_next()
+            if job_id is None:
+                sweep()
+                if once:
+                    return count
+                time.sleep(poll_interval)
+                continue
+            status = run_job(job_id)
+            count += 1
+            if log:
+                log(f'Job {job_id} {status}')
+
+    # Spawned children start clean rather than inheriting this process's
+    # database connections; the initializer must not import tracker models
+    connections.close_all()
+    count = 0
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=django.setup) as pool:
+        running = {}
+        while True:
+            while len(running) < processes:
+                job_id = claim_next()
+                if job_id is None:
+                    break
+                running[pool.submit(_run_in_process, job_id)] = job_id
+            if not running:
+                sweep()
+                if once:
+                    return count
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = running.pop(future)
+                count += 1
+                try:
+                    status = future.result()
+                except Exception as exc:
+                    # The process itself died; the handler's own errors are recorded by run_job
+                    Job.objects.filter(id=job_id).update(status='failed', error=repr(exc), finished_at=timezone.now())
+                    status = 'failed'
+                if log:
+                    log(f'Job {job_id} {status}')
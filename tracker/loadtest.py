@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from .fakedata import fake_user, generate_user_data
+from .models import Category, Transaction
+from .pagination import KeysetPage
+from .profiling import percentile
+from .services import get_summary
+
+LOAD_TEST_USER = 'loadtest'
+LOAD_TEST_TITLE = 'Load test write'
+
+# What a stock Django/sqlite3 connection runs with
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 5000,
+}
+
+
+def apply_pragmas(pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _read(user, today):
+    get_summary(user, today.year, today.month)
+    list(KeysetPage(Transaction.objects.filter(user=user).select_related('category'), per_page=10))
+
+
+def _write(user, category_id, rng, today):
+    with transaction.atomic():
+        Transaction.objects.create(
+            user=user,
+            title=LOAD_TEST_TITLE,
+            amount=Decimal(rng.randint(100, 10000)) / 100,
+            category_id=category_id,
+            transaction_type='expense',
+            date=today - timedelta(days=rng.randrange(60)),
+        )
+
+
+def _client(user, category_id, seconds, write_ratio, pragmas, seed, results):
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    stats = {'read': [], 'write': [], 'errors': 0}
+    try:
+        if pragmas:
+            apply_pragmas({name: value for name, value in pragmas.items() if name != 'journal_mode'})
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            kind = 'write' if rng.random() < write_ratio else 'read'
+            started = time.perf_counter()
+            try:
+                if kind == 'write':
+                    _write(user, category_id, rng, today)
+                else:
+                    _read(user, today)
+            except OperationalError:
+                # "database is locked" once the busy timeout runs out
+                stats['errors'] += 1
+                continue
+            stats[kind].append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+        results.append(stats)
+
+
+def _rounded(value):
+    return None if value is None else round(value, 2)
+
+
+def run_load_test(clients=8, seconds=10, write_ratio=0.2, pragmas=None, seed=0):
+    """
+    Run ``clients`` threads, each with its own database connection, mixing
+    reads (summary plus the first dashboard page) and writes (one
+    transaction per commit) for ``seconds``. ``pragmas`` are applied to
+    every client connection on SQLite.
+
+    Returns throughput, latency percentiles and the number of failed
+    operations.
+    """
+    user = fake_user(LOAD_TEST_USER)
+    if not Transaction.objects.filter(user=user).exists():
+        generate_user_data(user, transactions=5000, seed=seed)
+    category_id = Category.objects.filter(user=user, category_type='expense').values_list('id', flat=True).first()
+
+    if pragmas and 'journal_mode' in pragmas:
+        # The journal mode belongs to the database file, not the connection
+        apply_pragmas({'journal_mode': pragmas['journal_mode']})
+    connection.close()
+
+    results = []
+    threads = [
+        threading.Thread(target=_client, args=(user, category_id, seconds, write_ratio, pragmas, seed + n, results))
+        for n in range(clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    reads = [ms for stats in results for ms in stats['read']]
+    writes = [ms for stats in results for ms in stats['write']]
+    Transaction.objects.filter(user=user, title=LOAD_TEST_TITLE).delete()
+
+    return {
+        'clients': clients,
+        'seconds': round(elapsed, 2),
+        'write_ratio': write_ratio,
+        'pragmas': pragmas or {},
+        'reads_per_second': round(len(reads) / elapsed, 1),
+        'writes_per_second': round(len(writes) / elapsed, 1),
+        'read_p50_ms': _rounded(percentile(reads, 0.5)),
+        'read_p95_ms': _rounded(percentile(reads, 0.95)),
+        'write_p50_ms': _rounded(percentile(writes, 0.5)),
+        'write_p95_ms': _rounded(percentile(writes, 0.95)),
+        'errors': sum(stats['errors'] for stats in results),
+    }
+
+
+def tuned_sqlite_pragmas():
+    return getattr(settings, 'TRACKER_SQLITE_PRODUCTION_PRAGMAS', {})
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tracker.benchmarks import HANDLER_PATHS, asgi_throughput, benchmark_user, session_cookie, wsgi_throughput
+
+class Command(BaseCommand):
+    help = ('Compares requests per second of the dashboard, analytics and budget pages served by the WSGI handler '
+            '(synchronous views, a fixed pool of worker threads) and the ASGI handler (async views, one event loop) '
+            'when every client is slow to receive its response. Each handler runs in its own process.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Transactions of the benchmark user')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--connections', type=int, default=64, help='Concurrent ASGI client connections')
+        parser.add_argument('--client-latency', type=float, default=0.05,
+                            help='Seconds each client takes to receive a response')
+        parser.add_argument('--paths', nargs='+', default=list(HANDLER_PATHS))
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], help='Measure a single handler in this process')
+        parser.add_argument('--cookie', help='Session cookie to send (with --handler)')
+
+    def handle(self, *args, **options):
+        if options['handler']:
+            return self.measure(options)
+
+        cookie = session_cookie(benchmark_user(options['size']))
+        results = {}
+        for handler, async_views in (('wsgi', '0'), ('asgi', '1')):
+            self.stderr.write(f'Measuring {handler}...')
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_handlers', '--handler', handler,
+                '--cookie', cookie, '--seconds', str(options['seconds']), '--workers', str(options['workers']),
+                '--connections', str(options['connections']), '--client-latency', str(options['client_latency']),
+                '--paths', *options['paths'],
+            ]
+            child = subprocess.run(
+                command, env={**os.environ, 'MONEYMAP_ASYNC_VIEWS': async_views}, capture_output=True, text=True,
+            )
+            if child.returncode:
+                raise CommandError(f'{handler} run failed:\n{child.stderr}')
+            results[handler] = json.loads(child.stdout)
+            self.stderr.write(
+                f"  {results[handler]['requests_per_second']} requests/s, p95 {results[handler]['p95_ms']}ms, "
+                f"{results[handler]['errors']} errors"
+            )
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Successfully wrote handler benchmark to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def measure(self, options):
+        if not options['cookie']:
+            raise CommandError('--handler needs --cookie')
+        if options['handler'] == 'wsgi':
+            result = wsgi_throughput(
+                options['paths'], options['cookie'], workers=options['workers'], seconds=options['seconds'],
+                client_latency=options['client_latency'],
+            )
+            result['workers'] = options['workers']
+        else:
+            result = asgi_throughput(
+                options['paths'], options['cookie'], connections=options['connections'], seconds=options['seconds'],
+                client_latency=options['client_latency'],
+            )
+            result['connections'] = options['connections']
+        result['async_views'] = settings.TRACKER_ASYNC_VIEWS
+        result['client_latency'] = options['client_latency']
+        self.stdout.write(json.dumps(result))
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from tracker.forecasting import compute_forecasts
+
+class Command(BaseCommand):
+    help = ("Recomputes every user's month-end spending forecasts and unusual-expense flags, "
+            'in batches of users spread over worker processes. Run it daily, e.g. from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Worker processes; 0 computes in this process')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per batch')
+        parser.add_argument('--date', type=date.fromisoformat, help='Compute as of this day (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        forecasts, anomalies = compute_forecasts(
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            today=options['date'],
+            log=self.stderr.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully computed {forecasts} forecasts and flagged {anomalies} transactions'
+        ))
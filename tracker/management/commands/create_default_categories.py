@@ -1,40 +1,27 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from tracker.models import Category
+from tracker.models import backfill_default_categories
 
 class Command(BaseCommand):
-    help = 'Creates default categories for all users'
+    help = 'Creates the default categories for all users that are missing them, a batch of users at a time'
 
-    def handle(self, *args, **kwargs):
-        default_categories = [
-            # Income categories
-            ('Salary', 'income'),
-            ('Freelance', 'income'),
-            ('Investment Returns', 'income'),
-            ('Business', 'income'),
-            ('Gift', 'income'),
-            ('Other Income', 'income'),
-            
-            # Expense categories
-            ('Food & Dining', 'expense'),
-            ('Transportation', 'expense'),
-            ('Shopping', 'expense'),
-            ('Entertainment', 'expense'),
-            ('Bills & Utilities', 'expense'),
-            ('Healthcare', 'expense'),
-            ('Education', 'expense'),
-            ('Rent', 'expense'),
-            ('Groceries', 'expense'),
-            ('Other Expense', 'expense'),
-        ]
-        
-        users = User.objects.all()
-        for user in users:
-            for name, cat_type in default_categories:
-                Category.objects.get_or_create(
-                    name=name,
-                    category_type=cat_type,
-                    user=user
-                )
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Users per INSERT statement')
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        last_id = 0
+        users = 0
+        created = 0
+        while True:
+            # Walk the users by primary key so every batch is an index range
+            batch = list(user_ids.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            created += backfill_default_categories(batch[0], batch[-1])
+            users += len(batch)
+            last_id = batch[-1]
         
-        self.stdout.write(self.style.SUCCESS('Successfully created default categories'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully created {created} default categories for {users} users'
+        ))
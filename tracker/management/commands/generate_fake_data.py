@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from tracker.fakedata import fake_user, generate_user_data
+
+class Command(BaseCommand):
+    help = 'Generates users with realistic transactions, budgets and recurring rules for testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Number of users to fill')
+        parser.add_argument('--prefix', default='demo', help='Usernames are <prefix>_<n>')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--transactions', type=int, default=1000, help='Transactions per user')
+        parser.add_argument('--days', type=int, default=730, help='Spread transactions over this many past days')
+        parser.add_argument('--categories', type=int, default=0, help='Custom categories per user, besides the defaults')
+        parser.add_argument('--budgets', type=int, default=5, help='Budget goals per user')
+        parser.add_argument('--recurring', type=int, default=5, help='Recurring rules per user')
+        parser.add_argument('--seed', type=int, help='Random seed, for repeatable data')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for n in range(1, options['users'] + 1):
+            user = fake_user(f"{options['prefix']}_{n}", options['password'])
+            seed = None if options['seed'] is None else options['seed'] + n
+            counts = generate_user_data(
+                user,
+                transactions=options['transactions'],
+                days=options['days'],
+                categories=options['categories'],
+                budgets=options['budgets'],
+                recurring=options['recurring'],
+                seed=seed,
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(
+                f"{user.username}: {counts['transactions']} transactions, "
+                f"{counts['budgets']} budget goals, {counts['recurring']} recurring rules"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully generated data for {options['users']} user(s)"))
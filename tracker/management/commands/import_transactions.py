@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from tracker.importers import import_transactions
+
+class Command(BaseCommand):
+    help = 'Imports transactions for a user from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('csv_file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        with open(options['csv_file'], encoding='utf-8-sig', newline='') as f:
+            result = import_transactions(user, f, batch_size=options['batch_size'])
+
+        for line_number, message in result['errors']:
+            self.stderr.write(f'Line {line_number}: {message}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported {result['created']} transactions ({len(result['errors'])} rows skipped)"
+        ))
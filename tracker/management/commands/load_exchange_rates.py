@@ -0,0 +1,35 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from tracker.currency import base_currency, load_rates
+
+class Command(BaseCommand):
+    help = 'Loads dated exchange rates from a CSV file with the columns date, currency, rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Rates are the value of one unit of the currency in TRACKER_BASE_CURRENCY')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = []
+        with open(options['csv_file'], encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            for line_number, row in enumerate(reader, start=2):
+                day = parse_date((row.get('date') or '').strip())
+                currency = (row.get('currency') or '').strip().upper()
+                try:
+                    rate = Decimal((row.get('rate') or '').strip())
+                except InvalidOperation:
+                    rate = None
+                if day is None or len(currency) != 3 or not rate or rate <= 0:
+                    raise CommandError(f'Line {line_number}: expected date, currency and a positive rate')
+                rows.append((day, currency, rate))
+
+        written, users = load_rates(rows, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully loaded {written} rates against {base_currency()} ({users} users re-aggregated)'
+        ))
@@ -0,0 +1,48 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tracker.loadtest import DEFAULT_SQLITE_PRAGMAS, run_load_test, tuned_sqlite_pragmas
+
+class Command(BaseCommand):
+    help = ('Measures read/write throughput with N concurrent database clients. With --compare on SQLite, '
+            'runs once with stock connection settings and once with the production PRAGMAs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that are writes')
+        parser.add_argument('--compare', action='store_true', help='SQLite only: stock settings, then tuned')
+        parser.add_argument('--output', help='Also write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        runs = {'current': None}
+        if options['compare'] and connection.vendor == 'sqlite':
+            if settings.TRACKER_SQLITE_PRAGMAS:
+                self.stderr.write(self.style.WARNING(
+                    'The production profile re-applies its PRAGMAs to every connection; '
+                    'run --compare under the development profile for a fair baseline'
+                ))
+            runs = {'default': DEFAULT_SQLITE_PRAGMAS, 'tuned': tuned_sqlite_pragmas()}
+
+        results = {}
+        for name, pragmas in runs.items():
+            self.stderr.write(f"Running {name} with {options['clients']} clients for {options['seconds']}s...")
+            results[name] = run_load_test(
+                clients=options['clients'],
+                seconds=options['seconds'],
+                write_ratio=options['write_ratio'],
+                pragmas=pragmas,
+            )
+            result = results[name]
+            self.stderr.write(
+                f"  {result['reads_per_second']} reads/s, {result['writes_per_second']} writes/s, "
+                f"write p95 {result['write_p95_ms']}ms, {result['errors']} errors"
+            )
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from tracker.balances import rebuild_balances, verify_balances
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily balance ledger from raw transactions, or with --verify only the users whose ledger drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only check or rebuild this username (repeatable)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare every ledger with its transactions and rebuild only those that differ')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('id', flat=True))
+
+        if not options['verify']:
+            written = rebuild_balances(users=user_ids if options['usernames'] else None, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {written} daily balance rows'))
+            return
+
+        drifted = verify_balances(user_ids)
+        for user_id in drifted:
+            self.stderr.write(f'Ledger of user {user_id} differs from its transactions')
+        written = rebuild_balances(users=drifted, batch_size=options['batch_size']) if drifted else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully verified {len(user_ids)} ledgers; rebuilt {len(drifted)} ({written} rows)'
+        ))
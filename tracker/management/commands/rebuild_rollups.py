@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from tracker.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly rollup table from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only rebuild rollups for this username (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+
+        written = rebuild_rollups(users=users, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {written} monthly rollup rows'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from tracker.search import rebuild_search_index, search_enabled
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of transaction titles and descriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only re-index transactions of this username (repeatable)')
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite; nothing to rebuild'))
+            return
+
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+
+        indexed = rebuild_search_index(users=users)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {indexed} transactions'))
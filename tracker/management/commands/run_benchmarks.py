@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from tracker.benchmarks import DEFAULT_SIZES, compare, run_benchmarks
+
+class Command(BaseCommand):
+    help = ('Times the dashboard, analytics, budget goals and export views plus the import and recurring '
+            'paths at several data sizes, and writes the results as JSON. Uses the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help='Transactions per benchmark user, e.g. 1000 100000 1000000')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per case')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='Compare against a report saved earlier')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed slowdown of the median before a case counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            sizes=options['sizes'],
+            repeat=options['repeat'],
+            seed=options['seed'],
+            log=self.stderr.write,
+        )
+
+        regressions = []
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            report['comparison'] = compare(report, baseline, options['tolerance'])
+            for row in report['comparison']:
+                self.stderr.write(
+                    f"{row['size']:>8} {row['case']:<20} {row['baseline_ms']:>10.1f}ms -> {row['median_ms']:>10.1f}ms "
+                    f"({row['ratio']:.2f}x, {row['baseline_queries']} -> {row['queries']} queries) {row['status']}"
+                )
+            regressions = [row for row in report['comparison'] if row['status'] == 'regression']
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Successfully wrote benchmark results to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark case(s) regressed')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from tracker.jobs import work
+
+class Command(BaseCommand):
+    help = ('Runs queued background jobs (exports, imports, rollup rebuilds) in a pool of worker processes. '
+            'Several workers can share the queue.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help='Jobs to run at once; 0 runs them one by one in this process')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between checks for new jobs')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        count = work(
+            processes=options['processes'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            log=self.stderr.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Successfully ran {count} jobs'))
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_rollups(apps, schema_editor):
+    Transaction = apps.get_model("tracker", "Transaction")
+    MonthlyRollup = apps.get_model("tracker", "MonthlyRollup")
+    rows = (
+        Transaction.objects.annotate(
+            year=ExtractYear("date"),
+            month=ExtractMonth("date"),
+        )
+        .values("user_id", "year", "month", "category_id", "transaction_type")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    MonthlyRollup.objects.bulk_create(
+        (MonthlyRollup(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0003_currency_recurringtransaction_budgetgoal"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[("income", "Income"), ("expense", "Expense")],
+                        max_length=7,
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="tracker.category",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("user", "year", "month", "category", "transaction_type"),
+                name="unique_monthly_rollup",
+            ),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0004_monthlyrollup"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "date", "transaction_type"],
+                name="txn_user_date_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "category", "date"], name="txn_user_category_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "transaction_type", "date"],
+                name="txn_user_type_date_idx",
+            ),
+        ),
+    ]
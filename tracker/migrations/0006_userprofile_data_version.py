@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0005_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="data_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
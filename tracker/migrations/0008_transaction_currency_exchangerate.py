@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0007_transaction_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("currency", models.CharField(max_length=3)),
+                ("date", models.DateField()),
+                ("rate", models.DecimalField(decimal_places=10, max_digits=20)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="currency",
+            field=models.CharField(blank=True, default="", max_length=3),
+        ),
+        migrations.AddConstraint(
+            model_name="exchangerate",
+            constraint=models.UniqueConstraint(
+                fields=("currency", "date"), name="unique_exchange_rate"
+            ),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    """
+    Fold every category into the oldest one with the same user, name and
+    type, moving transactions, recurring rules, budget goals and rollup
+    rows over first, so the unique constraint can be added.
+    """
+    Category = apps.get_model("tracker", "Category")
+    Transaction = apps.get_model("tracker", "Transaction")
+    RecurringTransaction = apps.get_model("tracker", "RecurringTransaction")
+    BudgetGoal = apps.get_model("tracker", "BudgetGoal")
+    MonthlyRollup = apps.get_model("tracker", "MonthlyRollup")
+
+    groups = (
+        Category.objects.values("user_id", "name", "category_type")
+        .annotate(keep=Min("id"), copies=Count("id"))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    for group in groups:
+        keep = group["keep"]
+        duplicates = list(
+            Category.objects.filter(
+                user_id=group["user_id"],
+                name=group["name"],
+                category_type=group["category_type"],
+            )
+            .exclude(id=keep)
+            .values_list("id", flat=True)
+        )
+        Transaction.objects.filter(category_id__in=duplicates).update(category_id=keep)
+        RecurringTransaction.objects.filter(category_id__in=duplicates).update(
+            category_id=keep
+        )
+
+        # One goal per (user, category): keep the goal already on ``keep``, if any
+        if BudgetGoal.objects.filter(category_id=keep).exists():
+            BudgetGoal.objects.filter(category_id__in=duplicates).delete()
+        else:
+            goal = BudgetGoal.objects.filter(category_id__in=duplicates).first()
+            if goal:
+                BudgetGoal.objects.filter(category_id__in=duplicates).exclude(
+                    id=goal.id
+                ).delete()
+                BudgetGoal.objects.filter(id=goal.id).update(category_id=keep)
+
+        for rollup in MonthlyRollup.objects.filter(category_id__in=duplicates):
+            target = MonthlyRollup.objects.filter(
+                user_id=rollup.user_id,
+                year=rollup.year,
+                month=rollup.month,
+                category_id=keep,
+                transaction_type=rollup.transaction_type,
+            ).first()
+            if target:
+                target.total += rollup.total
+                target.count += rollup.count
+                target.save(update_fields=["total", "count"])
+                rollup.delete()
+            else:
+                rollup.category_id = keep
+                rollup.save(update_fields=["category"])
+
+        Category.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0008_transaction_currency_exchangerate"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="category",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name", "category_type"), name="unique_category"
+            ),
+        ),
+    ]
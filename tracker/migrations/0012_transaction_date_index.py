@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 03:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0011_forecasts"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["date", "id"], name="txn_date_id_idx"),
+        ),
+    ]
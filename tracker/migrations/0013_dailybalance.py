@@ -0,0 +1,142 @@
+# Generated by Django 5.0.14 on 2026-10-18 03:18
+
+from bisect import bisect_right
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_balances(apps, schema_editor):
+    # Converts amounts into each owner's currency the way
+    # tracker.currency.converted_amount() did when this was written, row by
+    # row at the latest rate on or before the transaction date.
+    Transaction = apps.get_model("tracker", "Transaction")
+    DailyBalance = apps.get_model("tracker", "DailyBalance")
+    UserProfile = apps.get_model("tracker", "UserProfile")
+    ExchangeRate = apps.get_model("tracker", "ExchangeRate")
+
+    base = getattr(settings, "TRACKER_BASE_CURRENCY", "USD")
+    owner_currency = dict(UserProfile.objects.values_list("user_id", "currency"))
+    series = {}
+
+    def rate(currency, day):
+        if currency == base:
+            return Decimal("1")
+        if currency not in series:
+            rows = ExchangeRate.objects.filter(currency=currency).order_by("date")
+            series[currency] = list(zip(*rows.values_list("date", "rate"))) or [(), ()]
+        dates, rates = series[currency]
+        index = bisect_right(dates, day) - 1
+        return rates[index] if index >= 0 else None
+
+    def converted(user_id, currency, day, amount):
+        owner = owner_currency.get(user_id)
+        if not currency or currency == owner:
+            return amount
+        rate_from = rate(currency, day)
+        rate_to = rate(owner, day) if owner else None
+        if rate_from is None or not rate_to:
+            return amount
+        return (amount * rate_from / rate_to).quantize(Decimal("0.01"))
+
+    def day_rows():
+        key = None
+        income = expense = Decimal("0")
+        rows = Transaction.objects.order_by("user_id", "date").values_list(
+            "user_id", "date", "currency", "transaction_type", "amount"
+        )
+        for user_id, day, currency, transaction_type, amount in rows.iterator(chunk_size=1000):
+            if (user_id, day) != key:
+                if key is not None:
+                    yield key, income, expense
+                key = (user_id, day)
+                income = expense = Decimal("0")
+            amount = converted(user_id, currency, day, amount)
+            if transaction_type == "income":
+                income += amount
+            elif transaction_type == "expense":
+                expense += amount
+        if key is not None:
+            yield key, income, expense
+
+    def ledger_rows():
+        user = None
+        for (user_id, day), income, expense in day_rows():
+            if user_id != user:
+                user = user_id
+                running_income = running_expense = Decimal("0")
+            running_income += income
+            running_expense += expense
+            yield DailyBalance(
+                user_id=user_id,
+                date=day,
+                income=income,
+                expense=expense,
+                running_income=running_income,
+                running_expense=running_expense,
+                balance=running_income - running_expense,
+            )
+
+    DailyBalance.objects.bulk_create(ledger_rows(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0012_transaction_date_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "expense",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "running_income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "running_expense",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailybalance",
+            constraint=models.UniqueConstraint(
+                fields=("user", "date"), name="unique_daily_balance"
+            ),
+        ),
+        migrations.RunPython(build_balances, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+import threading
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.dispatch import receiver, Signal
 
 class Category(models.Model):
     CATEGORY_TYPES = [
@@ -15,11 +20,70 @@ class Category(models.Model):
     
     class Meta:
         verbose_name_plural = "Categories"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name', 'category_type'], name='unique_category'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.category_type})"
 
 
+# Every new user starts with these categories
+DEFAULT_CATEGORIES = (
+    ('Salary', 'income'),
+    ('Freelance', 'income'),
+    ('Investment Returns', 'income'),
+    ('Business', 'income'),
+    ('Gift', 'income'),
+    ('Other Income', 'income'),
+    ('Food & Dining', 'expense'),
+    ('Transportation', 'expense'),
+    ('Shopping', 'expense'),
+    ('Entertainment', 'expense'),
+    ('Bills & Utilities', 'expense'),
+    ('Healthcare', 'expense'),
+    ('Education', 'expense'),
+    ('Rent', 'expense'),
+    ('Groceries', 'expense'),
+    ('Other Expense', 'expense'),
+)
+
+
+def add_default_categories(user_ids, batch_size=None):
+    """
+    Give each of ``user_ids`` the DEFAULT_CATEGORIES in bulk inserts.
+    Categories a user already has are skipped by the unique constraint.
+    """
+    Category.objects.bulk_create(
+        [
+            Category(user_id=user_id, name=name, category_type=category_type)
+            for user_id in user_ids
+            for name, category_type in DEFAULT_CATEGORIES
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_default_categories(first_id, last_id):
+    """
+    add_default_categories() for every user with ``first_id <= id <=
+    last_id`` as a single INSERT ... SELECT, so large backfills build no
+    model instances. Existing categories are left alone.
+    """
+    values = ', '.join(['(%s, %s)'] * len(DEFAULT_CATEGORIES))
+    params = [value for category in DEFAULT_CATEGORIES for value in category]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Category._meta.db_table} (user_id, name, category_type) '
+            f'SELECT u.id, d.column1, d.column2 FROM {User._meta.db_table} u CROSS JOIN (VALUES {values}) d '
+            'WHERE u.id >= %s AND u.id <= %s '
+            'ON CONFLICT (user_id, name, category_type) DO NOTHING',
+            params + [first_id, last_id],
+        )
+        return cursor.rowcount
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('income', 'Income'),
@@ -33,10 +97,19 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=7, choices=TRANSACTION_TYPES)
     date = models.DateField()
     description = models.TextField(blank=True, null=True)
+    # Blank means the owner's profile currency
+    currency = models.CharField(max_length=3, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'date', 'transaction_type'], name='txn_user_date_type_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['user', 'transaction_type', 'date'], name='txn_user_type_date_idx'),
+            # Admin changelist ordering and date drilldown across all users
+            models.Index(fields=['date', 'id'], name='txn_date_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - ${self.amount}"
@@ -47,49 +120,37 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     monthly_income = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     currency = models.CharField(max_length=3, default='INR')
+    # Bumped whenever the user's transactions, categories, goals, income or currency change; API ETags derive from it
+    data_version = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    def save(self, *args, **kwargs):
+        # data_version only moves through bump_data_version(); writing back the
+        # value this instance was loaded with could undo a bump
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'data_version'
+            ]
+        super().save(*args, **kwargs)
+
 
 # Auto-create profile when user registers
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
-        
-        # Create default categories for new user
-        default_categories = [
-            ('Salary', 'income'),
-            ('Freelance', 'income'),
-            ('Investment Returns', 'income'),
-            ('Business', 'income'),
-            ('Gift', 'income'),
-            ('Other Income', 'income'),
-            ('Food & Dining', 'expense'),
-            ('Transportation', 'expense'),
-            ('Shopping', 'expense'),
-            ('Entertainment', 'expense'),
-            ('Bills & Utilities', 'expense'),
-            ('Healthcare', 'expense'),
-            ('Education', 'expense'),
-            ('Rent', 'expense'),
-            ('Groceries', 'expense'),
-            ('Other Expense', 'expense'),
-        ]
-        
-        for name, cat_type in default_categories:
-            Category.objects.create(
-                name=name,
-                category_type=cat_type,
-                user=instance
-            )
+        add_default_categories([instance.pk])
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    # Partial saves, like the last_login update on every login, leave the profile alone
+    if update_fields is None:
+        instance.profile.save()
 
 # Add new model for Budget Goals
 class BudgetGoal(models.Model):
@@ -135,4 +196,304 @@ class Currency(models.Model):
     symbol = models.CharField(max_length=10)
     
     def __str__(self):
-        return f"{self.code} ({self.symbol})"
\ No newline at end of file
+        return f"{self.code} ({self.symbol})"
+
+
+class ExchangeRate(models.Model):
+    # Value of one unit of ``currency`` in settings.TRACKER_BASE_CURRENCY from ``date`` on
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'date'], name='unique_exchange_rate'),
+        ]
+    
+    def __str__(self):
+        return f"{self.currency} {self.date}: {self.rate}"
+
+
+# Pre-aggregated monthly totals, kept in sync with Transaction
+class MonthlyRollup(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    transaction_type = models.CharField(max_length=7, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'category', 'transaction_type'],
+                name='unique_monthly_rollup',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.year}-{self.month:02d} {self.transaction_type}: {self.total}"
+
+
+# Running totals of a user's transactions up to and including each day
+# that has any, so a balance as of any date is one indexed lookup; kept in
+# sync by tracker.balances
+class DailyBalance(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    # That day's totals
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Totals of every day up to and including this one
+    running_income = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    running_expense = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_balance'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.date}: {self.balance}"
+
+
+# Month-end spending projections, recomputed by `manage.py compute_forecasts`
+# (tracker.forecasting); a row without a category covers all expenses
+class SpendingForecast(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    spent = models.DecimalField(max_digits=14, decimal_places=2)
+    projected = models.DecimalField(max_digits=14, decimal_places=2)
+    # The budget goal's limit when the forecast was made
+    budget = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'month', 'category'], name='unique_spending_forecast'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.year}-{self.month:02d} {self.category or 'all'}: {self.projected}"
+    
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.projected > self.budget
+
+
+# Expenses far above what the user usually spends in that category
+class TransactionAnomaly(models.Model):
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='anomaly')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    score = models.FloatField()
+    typical_amount = models.DecimalField(max_digits=14, decimal_places=2)
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.transaction} ({self.score:.1f})"
+
+
+# Work queued by the web process and run by `manage.py run_worker` (tracker.jobs)
+class Job(models.Model):
+    KIND_CHOICES = [
+        ('export', 'Export transactions'),
+        ('import', 'Import transactions'),
+        ('rebuild_rollups', 'Recalculate totals'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='jobs/input/', blank=True)
+    result_file = models.FileField(upload_to='jobs/results/', blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='job_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+
+# Sent after a user's transactions change, including bulk writes that skip
+# post_save. ``dates`` holds every transaction date that was touched. The
+# optional ``fields`` (tracker.bulk) names the only columns that changed in
+# rows that still exist; rows may also have been added or removed.
+transactions_changed = Signal()
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, **kwargs):
+    instance._previous = None
+    if instance.pk:
+        instance._previous = sender.objects.filter(pk=instance.pk).values('user_id', 'date').first()
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    dates = [instance.date]
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        if previous['user_id'] == instance.user_id:
+            dates.append(previous['date'])
+        else:
+            transactions_changed.send(sender=Transaction, user_id=previous['user_id'], dates=[previous['date']])
+    transactions_changed.send(sender=Transaction, user_id=instance.user_id, dates=dates)
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    transactions_changed.send(sender=Transaction, user_id=instance.user_id, dates=[instance.date])
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Transactions fall back to "uncategorized", which moves them between
+    # rollup rows. Its months are read before the cascade drops its rows; the
+    # refresh runs once per user after the delete commits.
+    from .rollups import schedule_refresh
+    from .cache import invalidate_categories
+    months = MonthlyRollup.objects.filter(category=instance).values_list('year', 'month').distinct()
+    schedule_refresh(instance.user_id, set(months))
+    invalidate_categories(instance.user_id)
+    bump_data_version(instance.user_id)
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    # A renamed category shows up under its old name in cached breakdowns,
+    # a new one is missing from cached category pickers
+    from .cache import invalidate_categories, invalidate_fragments
+    if created:
+        invalidate_fragments(instance.user_id, 'categories')
+    else:
+        invalidate_categories(instance.user_id)
+    bump_data_version(instance.user_id)
+
+@receiver(transactions_changed)
+def update_monthly_rollups(sender, user_id, dates, **kwargs):
+    from .rollups import schedule_refresh
+    schedule_refresh(user_id, {(d.year, d.month) for d in dates})
+
+@receiver(transactions_changed)
+def update_daily_balances(sender, user_id, dates, **kwargs):
+    from .balances import schedule_refresh
+    schedule_refresh(user_id, dates)
+
+@receiver(transactions_changed)
+def invalidate_cached_months(sender, user_id, dates, **kwargs):
+    from .cache import invalidate_months
+    invalidate_months(user_id, {(d.year, d.month) for d in dates})
+
+@receiver(transactions_changed)
+def update_search_index(sender, user_id, dates, fields=None, **kwargs):
+    if fields is not None and not {'title', 'description'} & set(fields):
+        return
+    from .search import index_dates
+    index_dates(user_id, dates)
+
+@receiver(post_delete, sender=Transaction)
+def remove_from_search_index(sender, instance, **kwargs):
+    from .search import unindex
+    unindex([instance.pk])
+
+@receiver(post_save, sender=BudgetGoal)
+@receiver(post_delete, sender=BudgetGoal)
+def invalidate_cached_goals(sender, instance, **kwargs):
+    from .cache import invalidate_goals
+    invalidate_goals(instance.user_id)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    from .cache import invalidate_profile
+    invalidate_profile(instance.user_id)
+
+@receiver(pre_save, sender=UserProfile)
+def remember_previous_profile(sender, instance, **kwargs):
+    instance._previous_currency = instance._previous_income = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('currency', 'monthly_income').first()
+        if previous:
+            instance._previous_currency, instance._previous_income = previous
+
+@receiver(post_save, sender=UserProfile)
+def profile_currency_changed(sender, instance, created, **kwargs):
+    # Rollup and ledger totals are converted into the profile currency
+    previous = getattr(instance, '_previous_currency', None)
+    if created or previous is None or previous == instance.currency:
+        return
+    if Transaction.objects.filter(user_id=instance.user_id).exclude(currency='').exists():
+        from .rollups import rebuild_rollups
+        from .balances import rebuild_balances
+        from .cache import invalidate_categories
+        rebuild_rollups(users=[instance.user_id])
+        rebuild_balances(users=[instance.user_id])
+        invalidate_categories(instance.user_id)
+
+
+_pending_versions = threading.local()
+
+def bump_data_version(user_id):
+    """
+    Mark ``user_id``'s data as changed once the current transaction commits.
+    Bumps are de-duplicated, so a bulk delete costs a single UPDATE.
+    """
+    if not hasattr(_pending_versions, 'user_ids'):
+        _pending_versions.user_ids = set()
+    _pending_versions.user_ids.add(user_id)
+    transaction.on_commit(_flush_data_versions)
+
+def _flush_data_versions():
+    user_ids = getattr(_pending_versions, 'user_ids', set())
+    _pending_versions.user_ids = set()
+    if user_ids:
+        UserProfile.objects.filter(user_id__in=user_ids).update(data_version=F('data_version') + 1)
+
+@receiver(transactions_changed)
+def transactions_data_changed(sender, user_id, **kwargs):
+    bump_data_version(user_id)
+
+@receiver(post_save, sender=BudgetGoal)
+@receiver(post_delete, sender=BudgetGoal)
+def goals_data_changed(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+@receiver(post_save, sender=UserProfile)
+def profile_data_changed(sender, instance, created, **kwargs):
+    # Only the income and currency show up in the user's data; a save that
+    # leaves them alone keeps every ETag valid
+    previous = (getattr(instance, '_previous_currency', None), getattr(instance, '_previous_income', None))
+    if not created and previous != (instance.currency, instance.monthly_income):
+        bump_data_version(instance.user_id)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    # Per-connection tuning for the production profile; WAL mode itself persists in the file
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'TRACKER_SQLITE_PRAGMAS', {})
+    if pragmas:
+        with connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
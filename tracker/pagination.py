@@ -0,0 +1,110 @@
+import base64
+from datetime import date
+
+from django.db.models import Q
+
+
+def encode_cursor(day, pk):
+    """Opaque, URL-safe token for the (date, id) position of a transaction."""
+    raw = f'{day.isoformat()}:{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); returns ``None`` for a missing or malformed token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        day, pk = raw.split(':')
+        return date.fromisoformat(day), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """
+    One page of transactions ordered by ``-date, -id``.
+
+    Instead of OFFSET, a page starts strictly after the (date, id) of the
+    last row of the previous page (``after``), or ends strictly before the
+    first row of the next one (``before``), so every page is an index range
+    scan no matter how deep it is.
+
+    ``annotations`` are computed for the rows of the page only: the page's
+    ids are picked in a subquery and the annotations added around it,
+    still in one query.
+    """
+    def __init__(self, queryset, after=None, before=None, per_page=10, annotations=None):
+        self._prepare(queryset, after, before, per_page, annotations)
+        self._load(list(self._query))
+
+    @classmethod
+    async def afetch(cls, queryset, after=None, before=None, per_page=10, annotations=None):
+        """Async counterpart of the constructor, for async views."""
+        page = cls.__new__(cls)
+        page._prepare(queryset, after, before, per_page, annotations)
+        page._load([row async for row in page._query])
+        return page
+
+    def _prepare(self, queryset, after, before, per_page, annotations=None):
+        self.per_page = per_page
+        self._backwards = False
+        self._after = None
+        position = decode_cursor(before)
+        if position:
+            # Walk backwards from the cursor, then restore the display order
+            day, pk = position
+            queryset = queryset.filter(Q(date__gt=day) | Q(date=day, id__gt=pk))
+            self._backwards = True
+            ordering = ('date', 'id')
+        else:
+            position = decode_cursor(after)
+            if position:
+                day, pk = position
+                queryset = queryset.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+            ordering = ('-date', '-id')
+            self._after = position
+
+        self._query = queryset.order_by(*ordering)[:per_page + 1]
+        if annotations:
+            page_ids = queryset.order_by(*ordering).values('id')[:per_page + 1]
+            # Only the id lookup outside, so the database fetches the page by
+            # primary key; the joins of ``queryset`` are kept
+            page = queryset.model._base_manager.filter(pk__in=page_ids)
+            page.query.select_related = queryset.query.select_related
+            self._query = page.annotate(**annotations).order_by(*ordering)
+
+    def _load(self, rows):
+        per_page = self.per_page
+        if self._backwards:
+            self.has_previous = len(rows) > per_page
+            self.has_next = True
+            self.object_list = rows[:per_page][::-1]
+        else:
+            self.has_previous = self._after is not None
+            self.has_next = len(rows) > per_page
+            self.object_list = rows[:per_page]
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if self.object_list:
+            first, last = self.object_list[0], self.object_list[-1]
+            if self.has_next:
+                self.next_cursor = encode_cursor(_value(last, 'date'), _value(last, 'id'))
+            if self.has_previous:
+                self.previous_cursor = encode_cursor(_value(first, 'date'), _value(first, 'id'))
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _value(row, name):
+    # Pages can hold model instances or values() dicts
+    return row[name] if isinstance(row, dict) else getattr(row, name)
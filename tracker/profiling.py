@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=_window()))
+_duplicates = defaultdict(Counter)
+_active = threading.local()
+
+
+def _window():
+    return getattr(settings, 'TRACKER_PROFILING_WINDOW', 500)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values`` (``fraction`` between 0 and 1)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class QueryRecorder:
+    """execute_wrapper that times every SQL statement run by a request."""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            # Parameters are still placeholders here, so an N+1 loop shows
+            # up as the same statement many times
+            self.shapes[sql] += 1
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.shapes.items() if count > 1}
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        sample = getattr(_active, 'sample', None)
+        if sample is None or _active.rendering:
+            return render(self, *args, **kwargs)
+        # Only the outermost render counts; includes are part of it
+        _active.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            sample['template_ms'] += (time.perf_counter() - started) * 1000
+            _active.rendering = False
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Record wall time, SQL queries, duplicate queries, template render time
+    and (optionally) peak traced memory for every request, grouped by URL
+    name into a rolling in-process window.
+
+    Opt-in: settings.py adds it to MIDDLEWARE when TRACKER_PROFILING is on.
+    Memory tracing is process-wide, so peaks overlap under concurrent
+    requests; it also slows Python down and has its own switch.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trace_memory = getattr(settings, 'TRACKER_PROFILING_MEMORY', False)
+        if not getattr(Template.render, 'profiled', False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        if request.path.startswith(settings.STATIC_URL):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        sample = {'template_ms': 0.0}
+        _active.sample, _active.rendering = sample, False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        try:
+            with connections['default'].execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            _active.sample = None
+
+        def finish():
+            sample.update({
+                'wall_ms': (time.perf_counter() - started) * 1000,
+                'queries': recorder.count,
+                'sql_ms': recorder.seconds * 1000,
+                'duplicate_queries': sum(count - 1 for count in recorder.duplicates().values()),
+                'peak_kb': tracemalloc.get_traced_memory()[1] / 1024 if self.trace_memory else None,
+                'status': response.status_code,
+            })
+            match = request.resolver_match
+            record(match.view_name if match else '<unresolved>', sample, recorder.duplicates())
+
+        if response.streaming:
+            # Streaming views (the CSV export) query while the body is sent
+            response.streaming_content = self._stream(response.streaming_content, recorder, finish)
+        else:
+            finish()
+        return response
+
+    def _stream(self, content, recorder, finish):
+        with connections['default'].execute_wrapper(recorder):
+            yield from content
+        finish()
+
+
+def record(name, sample, duplicates=None):
+    with _lock:
+        _samples[name].append(sample)
+        _duplicates[name].update(duplicates or {})
+
+
+def reset_profiles():
+    with _lock:
+        _samples.clear()
+        _duplicates.clear()
+
+
+def profile_report():
+    """Per URL name: request count and p50/p95/p99 of each measurement in the window."""
+    with _lock:
+        samples = {name: list(window) for name, window in _samples.items()}
+        duplicates = {name: counter.most_common(5) for name, counter in _duplicates.items()}
+
+    report = {}
+    for name, window in sorted(samples.items()):
+        entry = {'requests': len(window)}
+        for metric in ('wall_ms', 'sql_ms', 'template_ms', 'queries', 'duplicate_queries', 'peak_kb'):
+            values = [sample[metric] for sample in window if sample[metric] is not None]
+            entry[metric] = {
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+                'max': max(values, default=None),
+            }
+        entry['errors'] = sum(1 for sample in window if sample['status'] >= 500)
+        entry['top_duplicates'] = [{'sql': sql, 'count': count} for sql, count in duplicates.get(name, [])]
+        report[name] = entry
+    return report
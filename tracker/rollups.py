@@ -0,0 +1,94 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .currency import converted_amount
+from .models import MonthlyRollup, Transaction
+from .services import month_bounds
+
+
+_pending = threading.local()
+
+
+def _bucket_rows(queryset):
+    return queryset.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    ).values(
+        'user_id', 'year', 'month', 'category_id', 'transaction_type'
+    ).annotate(
+        total=Sum(converted_amount()),
+        count=Count('id'),
+    ).order_by()
+
+
+def refresh_months(user_id, months):
+    """Recompute the rollup rows of ``user_id`` for each (year, month) given."""
+    for year, month in months:
+        start, end = month_bounds(year, month)
+        with transaction.atomic():
+            MonthlyRollup.objects.filter(user_id=user_id, year=year, month=month).delete()
+            rows = _bucket_rows(Transaction.objects.filter(
+                user_id=user_id, date__gte=start, date__lt=end
+            ))
+            MonthlyRollup.objects.bulk_create([MonthlyRollup(**row) for row in rows])
+
+
+def schedule_refresh(user_id, months):
+    """
+    Queue a refresh of ``months`` for ``user_id`` that runs once the current
+    database transaction commits (immediately under autocommit).
+
+    Deleting thousands of transactions sends thousands of post_delete
+    signals; queueing collapses them into one refresh per touched month.
+    """
+    if not hasattr(_pending, 'months'):
+        _pending.months = set()
+    _pending.months.update((user_id, year, month) for year, month in months)
+    transaction.on_commit(run_pending)
+
+
+def run_pending():
+    """
+    Run the queued refreshes now. Bulk writes call this before they commit,
+    so the rollups change in the same transaction as the rows.
+    """
+    pending = getattr(_pending, 'months', set())
+    _pending.months = set()
+    by_user = {}
+    for user_id, year, month in pending:
+        by_user.setdefault(user_id, set()).add((year, month))
+    # Deleting a user queues refreshes for everything the cascade removed
+    existing = set(User.objects.filter(pk__in=by_user).values_list('pk', flat=True)) if by_user else set()
+    for user_id, months in by_user.items():
+        if user_id in existing:
+            refresh_months(user_id, months)
+
+
+def rebuild_rollups(users=None, batch_size=1000):
+    """
+    Rebuild the rollup table from scratch, either for every user or only
+    for the given user ids. Returns the number of rollup rows written.
+    """
+    rollups = MonthlyRollup.objects.all()
+    transactions = Transaction.objects.all()
+    if users is not None:
+        rollups = rollups.filter(user_id__in=users)
+        transactions = transactions.filter(user_id__in=users)
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in _bucket_rows(transactions).iterator(chunk_size=batch_size):
+            batch.append(MonthlyRollup(**row))
+            if len(batch) >= batch_size:
+                MonthlyRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        MonthlyRollup.objects.bulk_create(batch)
+        written += len(batch)
+    return written
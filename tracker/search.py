@@ -0,0 +1,143 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Transaction
+
+# Standalone FTS5 table keyed by the transaction id (its rowid). The owner
+# column holds a "u<user id>" token so a user's search only intersects
+# that user's postings instead of matching every row in the table.
+FTS_TABLE = 'tracker_transaction_fts'
+
+# SQLite caps the number of bound parameters per statement
+_DATE_CHUNK = 500
+
+
+def search_enabled():
+    """True when the default database can serve searches from the FTS index."""
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text, user_id=None):
+    """
+    FTS5 MATCH expression for free-text ``text``: every word must appear in
+    the title or description, each as a prefix. Returns ``None`` when the
+    text has no searchable words.
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"*' for word in words)
+    query = f'{{title description}} : ({terms})'
+    if user_id is not None:
+        query = f'owner : "u{user_id}" AND {query}'
+    return query
+
+
+def search_filter(text, user_id=None):
+    """
+    Q object matching transactions whose title or description contain
+    ``text``: an indexed lookup on SQLite, ``icontains`` elsewhere.
+    """
+    if not search_enabled():
+        return Q(title__icontains=text) | Q(description__icontains=text)
+
+    query = match_query(text, user_id)
+    if query is None:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query]))
+
+
+def ranked(queryset, text, user_id=None):
+    """
+    Transactions of ``queryset`` matching ``text``, best match first
+    (bm25 over title and description), with the score as ``search_rank``.
+    """
+    if not search_enabled():
+        return queryset.filter(search_filter(text)).order_by('-date', '-id')
+
+    query = match_query(text, user_id)
+    if query is None:
+        return queryset.none()
+    table = Transaction._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[query],
+        select={'search_rank': f'{FTS_TABLE}.rank'},
+        order_by=['search_rank', '-date', '-id'],
+    )
+
+
+def index_dates(user_id, dates):
+    """Re-index every transaction of ``user_id`` dated on one of ``dates``."""
+    if not search_enabled():
+        return
+    table = Transaction._meta.db_table
+    dates = sorted(dates)
+    with connection.cursor() as cursor:
+        for i in range(0, len(dates), _DATE_CHUNK):
+            chunk = dates[i:i + _DATE_CHUNK]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            params = [user_id, *chunk]
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+                f'(SELECT id FROM {table} WHERE user_id = %s AND date IN ({placeholders}))',
+                params,
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, owner) '
+                f"SELECT id, title, description, 'u' || user_id FROM {table} "
+                f'WHERE user_id = %s AND date IN ({placeholders})',
+                params,
+            )
+
+
+def unindex(ids):
+    """Drop the index entries of deleted transactions."""
+    if not search_enabled():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), _DATE_CHUNK):
+            chunk = ids[i:i + _DATE_CHUNK]
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})",
+                chunk,
+            )
+
+
+def rebuild_search_index(users=None):
+    """
+    Rebuild the index from the transaction table, for every user or only
+    for the ids in ``users``. Returns the number of rows indexed.
+    """
+    if not search_enabled():
+        return 0
+    table = Transaction._meta.db_table
+    where, params = '', []
+    if users is not None:
+        users = list(users)
+        if not users:
+            return 0
+        where = f"WHERE user_id IN ({', '.join(['%s'] * len(users))})"
+        params = users
+
+    with connection.cursor() as cursor:
+        if users is None:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE owner MATCH %s", [
+                ' OR '.join(f'"u{user_id}"' for user_id in users)
+            ])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, owner) '
+            f"SELECT id, title, description, 'u' || user_id FROM {table} {where}",
+            params,
+        )
+        indexed = cursor.rowcount
+        # Merge the index b-trees written by the bulk insert
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
@@ -0,0 +1,341 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .currency import converted_amount
+from .models import BudgetGoal, MonthlyRollup, Transaction
+from .search import search_filter
+
+
+SERIES_GRANULARITIES = ('week', 'month', 'year')
+MAX_SERIES_PERIODS = 120
+
+
+def add_months(day, months):
+    """Shift ``day`` by ``months`` calendar months, clamping to the month's end (Jan 31 -> Feb 28)."""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def month_bounds(year, month):
+    """
+    Half-open ``[start, end)`` date range covering one calendar month.
+
+    Filtering with ``date__gte``/``date__lt`` lets the (user, date, ...)
+    indexes be used, which ``date__month`` lookups cannot.
+    """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def filter_transactions(queryset, params, user_id=None):
+    """
+    Apply the dashboard's list filters from a ``request.GET``-like mapping:
+    ``category``, ``type``, ``search`` and an optional ``start``/``end``
+    date range (both inclusive, ``YYYY-MM-DD``).
+
+    ``search`` uses the full-text index; passing the owner's ``user_id``
+    narrows the index lookup to their rows.
+    """
+    category_filter = params.get('category', '')
+    type_filter = params.get('type', '')
+    search_query = params.get('search', '')
+
+    if category_filter:
+        # An id that cannot exist matches nothing, rather than being dropped
+        # and widening the selection
+        if not category_filter.isdigit():
+            return queryset.none()
+        queryset = queryset.filter(category_id=category_filter)
+
+    if type_filter:
+        queryset = queryset.filter(transaction_type=type_filter)
+
+    if search_query:
+        queryset = queryset.filter(search_filter(search_query, user_id))
+
+    for param, lookup in (('start', 'date__gte'), ('end', 'date__lte')):
+        try:
+            value = parse_date(params.get(param, ''))
+        except ValueError:
+            value = None
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+
+    return queryset
+
+
+def _count_rollups(user, params):
+    if params.get('search', ''):
+        return None
+
+    rollups = MonthlyRollup.objects.filter(user=user)
+    if params.get('category', ''):
+        if not params['category'].isdigit():
+            return rollups.none()
+        rollups = rollups.filter(category_id=params['category'])
+    if params.get('type', ''):
+        rollups = rollups.filter(transaction_type=params['type'])
+
+    for param, lookup in (('start', 'gte'), ('end', 'lte')):
+        try:
+            value = parse_date(params.get(param, ''))
+        except ValueError:
+            value = None
+        if value:
+            rollups = rollups.filter(
+                Q(**{f'year__{lookup[:2]}': value.year}) |
+                Q(year=value.year, **{f'month__{lookup}': value.month})
+            )
+
+    return rollups
+
+
+def approximate_count(user, params):
+    """
+    Number of ``user``'s transactions matching filter_transactions(params),
+    read from the monthly rollups instead of a COUNT(*) over the table.
+
+    Category and type filters are exact. A ``start``/``end`` range counts
+    the whole months it overlaps, so the figure is approximate. Returns
+    ``None`` for text searches, which the rollups cannot answer.
+    """
+    rollups = _count_rollups(user, params)
+    if rollups is None:
+        return None
+    return rollups.aggregate(count=Coalesce(Sum('count'), 0))['count']
+
+
+async def aapproximate_count(user, params):
+    """Async approximate_count()."""
+    rollups = _count_rollups(user, params)
+    if rollups is None:
+        return None
+    return (await rollups.aaggregate(count=Coalesce(Sum('count'), 0)))['count']
+
+
+def _summary_rows(user, year, month):
+    start, end = month_bounds(year, month)
+    in_month = Q(date__gte=start, date__lt=end)
+    is_income = Q(transaction_type='income')
+    is_expense = Q(transaction_type='expense')
+
+    amount = converted_amount()
+
+    return Transaction.objects.filter(user=user).values(
+        'category_id', 'category__name'
+    ).annotate(
+        income=Sum(amount, filter=is_income),
+        expense=Sum(amount, filter=is_expense),
+        month_income=Sum(amount, filter=in_month & is_income),
+        month_expense=Sum(amount, filter=in_month & is_expense),
+    ).order_by()
+
+
+def _fold_summary(rows):
+    summary = {
+        'total_income': Decimal('0'),
+        'total_expense': Decimal('0'),
+        'month_income': Decimal('0'),
+        'month_expense': Decimal('0'),
+        'category_breakdown': [],
+    }
+    for row in rows:
+        summary['total_income'] += row['income'] or 0
+        summary['total_expense'] += row['expense'] or 0
+        summary['month_income'] += row['month_income'] or 0
+        summary['month_expense'] += row['month_expense'] or 0
+        if row['month_expense']:
+            summary['category_breakdown'].append({
+                'category_id': row['category_id'],
+                'category__name': row['category__name'],
+                'total': row['month_expense'],
+            })
+
+    summary['category_breakdown'].sort(key=lambda item: item['total'], reverse=True)
+    return summary
+
+
+def get_summary(user, year, month):
+    """
+    All-time totals plus the given month's figures for ``user``.
+
+    Everything comes out of a single query grouped by category with
+    conditional sums, so callers never rescan the transaction table.
+    Amounts in other currencies are converted in that same query.
+    """
+    return _fold_summary(_summary_rows(user, year, month))
+
+
+async def aget_summary(user, year, month):
+    """Async get_summary()."""
+    return _fold_summary([row async for row in _summary_rows(user, year, month)])
+
+
+def _month_rollup_rows(user, months):
+    in_months = Q()
+    for year, month in months:
+        in_months |= Q(year=year, month=month)
+
+    return MonthlyRollup.objects.filter(in_months, user=user).values(
+        'year', 'month', 'category_id', 'category__name', 'transaction_type', 'total'
+    ).order_by('-total')
+
+
+def _fold_month_summaries(months, rows):
+    summaries = {
+        key: {'month_income': Decimal('0'), 'month_expense': Decimal('0'), 'category_breakdown': []}
+        for key in months
+    }
+    for row in rows:
+        summary = summaries[(row['year'], row['month'])]
+        summary['month_' + row['transaction_type']] += row['total']
+        if row['transaction_type'] == 'expense':
+            summary['category_breakdown'].append({
+                'category_id': row['category_id'],
+                'category__name': row['category__name'],
+                'total': row['total'],
+            })
+    return summaries
+
+
+def get_month_summaries(user, months):
+    """
+    Income, expense and the expense breakdown by category for each
+    (year, month) in ``months``, read from the rollup table in one query.
+
+    Each value has the same ``month_*``/``category_breakdown`` keys as
+    get_summary(); the dict is keyed by (year, month).
+    """
+    months = set(months)
+    rows = _month_rollup_rows(user, months) if months else []
+    return _fold_month_summaries(months, rows)
+
+
+async def aget_month_summaries(user, months):
+    """Async get_month_summaries()."""
+    months = set(months)
+    rows = [row async for row in _month_rollup_rows(user, months)] if months else []
+    return _fold_month_summaries(months, rows)
+
+
+def _budget_goals(user, year, month):
+    spent = MonthlyRollup.objects.filter(
+        user=OuterRef('user'),
+        category=OuterRef('category'),
+        year=year,
+        month=month,
+        transaction_type='expense',
+    ).values('total')[:1]
+
+    return BudgetGoal.objects.filter(user=user).select_related('category').annotate(
+        spent=Coalesce(Subquery(spent), Value(Decimal('0')), output_field=DecimalField()),
+    ).order_by('category__name')
+
+
+def _budget_progress(goals):
+    progress = []
+    for goal in goals:
+        percentage = (goal.spent / goal.monthly_limit * 100) if goal.monthly_limit > 0 else 0
+        progress.append({
+            'goal': goal,
+            'spent': goal.spent,
+            'remaining': goal.monthly_limit - goal.spent,
+            'percentage': min(percentage, 100)
+        })
+    return progress
+
+
+def get_budget_progress(user, year, month):
+    """
+    Spent, remaining and percentage for each of ``user``'s budget goals in
+    the given month. Spending is joined onto the goals from the rollup
+    table, so this is one query however many goals there are.
+    """
+    return _budget_progress(_budget_goals(user, year, month))
+
+
+async def aget_budget_progress(user, year, month):
+    """Async get_budget_progress()."""
+    return _budget_progress([goal async for goal in _budget_goals(user, year, month)])
+
+
+def _series_query(user, periods, granularity, end):
+    # Period starts, the grouped rows, the start of each row's period and the label format
+    if granularity not in SERIES_GRANULARITIES:
+        raise ValueError(f'Unknown granularity: {granularity}')
+    end = end or timezone.localdate()
+
+    if granularity == 'week':
+        first = end - timedelta(days=end.weekday())
+        starts = [first - timedelta(weeks=n) for n in range(periods - 1, -1, -1)]
+        rows = Transaction.objects.filter(
+            user=user, date__gte=starts[0], date__lt=first + timedelta(weeks=1)
+        ).annotate(period=TruncWeek('date')).values('period').annotate(
+            income=Sum(converted_amount(), filter=Q(transaction_type='income')),
+            expense=Sum(converted_amount(), filter=Q(transaction_type='expense')),
+        ).order_by()
+        return starts, rows, lambda row: row['period'], '%d %b %Y'
+
+    if granularity == 'month':
+        first = end.replace(day=1)
+        starts = [add_months(first, -n) for n in range(periods - 1, -1, -1)]
+        rows = MonthlyRollup.objects.filter(user=user).filter(
+            Q(year__gt=starts[0].year) | Q(year=starts[0].year, month__gte=starts[0].month)
+        ).filter(
+            Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month)
+        ).values('year', 'month').annotate(
+            income=Sum('total', filter=Q(transaction_type='income')),
+            expense=Sum('total', filter=Q(transaction_type='expense')),
+        ).order_by()
+        return starts, rows, lambda row: date(row['year'], row['month'], 1), '%b %Y'
+
+    starts = [date(end.year - n, 1, 1) for n in range(periods - 1, -1, -1)]
+    rows = MonthlyRollup.objects.filter(
+        user=user, year__gte=starts[0].year, year__lte=end.year
+    ).values('year').annotate(
+        income=Sum('total', filter=Q(transaction_type='income')),
+        expense=Sum('total', filter=Q(transaction_type='expense')),
+    ).order_by()
+    return starts, rows, lambda row: date(row['year'], 1, 1), '%Y'
+
+
+def _fill_series(starts, totals, label_format):
+    series = []
+    for start in starts:
+        row = totals.get(start, {})
+        series.append({
+            'period': start,
+            'label': start.strftime(label_format),
+            'income': row.get('income') or Decimal('0'),
+            'expense': row.get('expense') or Decimal('0'),
+        })
+    return series
+
+
+def get_series(user, periods=6, granularity='month', end=None):
+    """
+    Income and expense for the last ``periods`` calendar weeks, months or
+    years up to and including the one containing ``end`` (default today),
+    oldest first. Periods without transactions are filled with zeros.
+
+    Each series is a single grouped query: monthly and yearly figures come
+    from the rollup table, weekly ones from transactions truncated to the
+    (Monday-based) week.
+    """
+    starts, rows, period_of, label_format = _series_query(user, periods, granularity, end)
+    return _fill_series(starts, {period_of(row): row for row in rows}, label_format)
+
+
+async def aget_series(user, periods=6, granularity='month', end=None):
+    """Async get_series()."""
+    starts, rows, period_of, label_format = _series_query(user, periods, granularity, end)
+    return _fill_series(starts, {period_of(row): row async for row in rows}, label_format)
@@ -1,3 +1,1406 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO, TextIOWrapper
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Max, Min, Sum
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import async_views
+from .admin import DrilldownQuerySet
+from .balances import balance_as_of, balance_series, running_balance, verify_balances
+from .benchmarks import compare
+from .currency import RateTable, load_rates
+from .cache import cache_stats, cached_month_summaries, cached_summary, fragment_versions, reset_cache_stats
+from .fakedata import generate_user_data
+from .forecasting import compute_forecasts, find_outliers, project_month
+from .importers import import_transactions
+from .jobs import claim_next, enqueue, expire_files
+from .pagination import KeysetPage
+from .profiling import QueryRecorder, percentile, profile_report, reset_profiles
+from .models import (
+    DEFAULT_CATEGORIES, BudgetGoal, Category, Currency, DailyBalance, Job, MonthlyRollup,
+    RecurringTransaction, SpendingForecast, Transaction, TransactionAnomaly, configure_sqlite,
+)
+from .recurring import process_recurring
+from .rollups import rebuild_rollups
+from .search import rebuild_search_index, search_filter
+from .services import add_months, approximate_count, get_budget_progress, get_series, get_summary, month_bounds
+
+
+class SummaryServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.salary = Category.objects.get(user=self.user, name='Salary')
+
+    def add(self, amount, category, transaction_type, day):
+        return Transaction.objects.create(
+            user=self.user, title='t', amount=Decimal(amount), category=category,
+            transaction_type=transaction_type, date=day,
+        )
+
+    def test_summary_totals(self):
+        self.add('1000', self.salary, 'income', date(2025, 3, 1))
+        self.add('40', self.food, 'expense', date(2025, 3, 5))
+        self.add('60', self.food, 'expense', date(2025, 3, 20))
+        self.add('25', None, 'expense', date(2025, 2, 10))
+
+        with self.assertNumQueries(1):
+            summary = get_summary(self.user, 2025, 3)
+
+        self.assertEqual(summary['total_income'], Decimal('1000'))
+        self.assertEqual(summary['total_expense'], Decimal('125'))
+        self.assertEqual(summary['month_income'], Decimal('1000'))
+        self.assertEqual(summary['month_expense'], Decimal('100'))
+        self.assertEqual(summary['category_breakdown'], [
+            {'category_id': self.food.id, 'category__name': 'Food & Dining', 'total': Decimal('100')},
+        ])
+
+    def dashboard_query_count(self):
+        # Measure the uncached path
+        cache.clear()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'), {'month': 3, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_an_invalid_month_shows_the_current_one(self):
+        self.client.force_login(self.user)
+        today = timezone.now()
+        for params in ({'month': 13}, {'month': 0}, {'month': 'may'}, {'year': 10000, 'month': 1}):
+            for name in ('dashboard', 'budget_goals'):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    (response.context['selected_year'], response.context['selected_month']),
+                    (today.year, today.month),
+                )
+
+    def test_dashboard_query_count_is_constant(self):
+        self.add('10', self.food, 'expense', date(2025, 3, 5))
+        baseline = self.dashboard_query_count()
+
+        for category in Category.objects.filter(user=self.user):
+            for day in (1, 2, 3):
+                self.add('5', category, category.category_type, date(2025, 3, day))
+        self.assertEqual(self.dashboard_query_count(), baseline)
+        self.assertLessEqual(baseline, 7)
+
+
+class MonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bob', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.rent = Category.objects.get(user=self.user, name='Rent')
+
+    def rollup_totals(self):
+        return {
+            (r.year, r.month, r.category_id, r.transaction_type): (r.total, r.count)
+            for r in MonthlyRollup.objects.filter(user=self.user)
+        }
+
+    def test_rollups_follow_transaction_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = Transaction.objects.create(
+                user=self.user, title='Lunch', amount=Decimal('12.50'), category=self.food,
+                transaction_type='expense', date=date(2025, 1, 31),
+            )
+            Transaction.objects.create(
+                user=self.user, title='Dinner', amount=Decimal('7.50'), category=self.food,
+                transaction_type='expense', date=date(2025, 1, 2),
+            )
+        self.assertEqual(self.rollup_totals(), {
+            (2025, 1, self.food.id, 'expense'): (Decimal('20.00'), 2),
+        })
+
+        txn.date = date(2025, 2, 1)
+        txn.category = self.rent
+        with self.captureOnCommitCallbacks(execute=True):
+            txn.save()
+        self.assertEqual(self.rollup_totals(), {
+            (2025, 1, self.food.id, 'expense'): (Decimal('7.50'), 1),
+            (2025, 2, self.rent.id, 'expense'): (Decimal('12.50'), 1),
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            txn.delete()
+        self.assertEqual(self.rollup_totals(), {
+            (2025, 1, self.food.id, 'expense'): (Decimal('7.50'), 1),
+        })
+
+    def test_bulk_delete_refreshes_each_month_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(1, 21):
+                Transaction.objects.create(
+                    user=self.user, title='x', amount=Decimal('1'), category=self.food,
+                    transaction_type='expense', date=date(2025, 4, day),
+                )
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                Transaction.objects.filter(user=self.user).delete()
+        rollup_refreshes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE FROM "tracker_monthlyrollup"')]
+        self.assertEqual(len(rollup_refreshes), 1)
+        self.assertEqual(self.rollup_totals(), {})
+
+    def test_deleting_a_category_moves_its_rows_to_uncategorized(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, title='Lunch', amount=Decimal('9'), category=self.food,
+                transaction_type='expense', date=date(2025, 5, 3),
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.delete()
+        self.assertEqual(self.rollup_totals(), {(2025, 5, None, 'expense'): (Decimal('9.00'), 1)})
+
+    def test_deleting_a_user_with_transactions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, title='Lunch', amount=Decimal('9'), category=self.food,
+                transaction_type='expense', date=date(2025, 5, 3),
+            )
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.delete()
+        # Foreign keys are checked when the delete commits, before its callbacks run
+        connection.check_constraints()
+        for callback in callbacks:
+            callback()
+        connection.check_constraints()
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (1, 15, 28):
+                Transaction.objects.create(
+                    user=self.user, title='x', amount=Decimal('3'), category=self.food,
+                    transaction_type='expense', date=date(2025, 3, day),
+                )
+        expected = self.rollup_totals()
+        MonthlyRollup.objects.all().delete()
+        self.assertEqual(rebuild_rollups(), 1)
+        self.assertEqual(self.rollup_totals(), expected)
+
+
+class TransactionIndexTests(TestCase):
+    """The queries the services and pages actually run, checked with EXPLAIN QUERY PLAN."""
+    TABLES = ('tracker_transaction', 'tracker_monthlyrollup')
+
+    def setUp(self):
+        self.user = User.objects.create_user('carol', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+
+    def assertUsesIndexes(self, run, *indexes):
+        """
+        Run ``run()`` and check no query it makes on the transaction or rollup
+        tables reads a whole table, and that each of ``indexes`` is searched.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN output is only checked on SQLite')
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            run()
+        checked = 0
+        plans = []
+        for sql, params in queries:
+            if not sql.startswith('SELECT') or not any(f'"{table}"' in sql for table in self.TABLES):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            # Tables are named by their alias (U0, W0...) inside subqueries;
+            # none of them may be read in full
+            self.assertNotRegex(plan, r'(?m)^SCAN (?!CONSTANT ROW)', sql)
+            plans.append(plan)
+            checked += 1
+        self.assertTrue(checked, 'no transaction or rollup queries were made')
+        for index in indexes:
+            self.assertTrue(any(f'INDEX {index} ' in plan for plan in plans), f'{index} is not used')
+
+    def test_dashboard_queries_use_indexes(self):
+        self.client.force_login(self.user)
+        for params, index in (
+            ({}, 'txn_user_date_type_idx'),
+            ({'category': self.food.pk}, 'txn_user_category_date_idx'),
+            ({'type': 'expense'}, 'txn_user_type_date_idx'),
+            ({'month': 12, 'year': 2025}, 'txn_user_date_type_idx'),
+        ):
+            cache.clear()
+            self.assertUsesIndexes(lambda: self.client.get(reverse('dashboard'), params), index)
+
+    def test_summary_and_series_use_indexes(self):
+        self.assertUsesIndexes(lambda: get_summary(self.user, 2025, 12), 'txn_user_category_date_idx')
+        self.assertUsesIndexes(lambda: get_series(self.user, 12, 'week', end=date(2025, 12, 31)), 'txn_user_date_type_idx')
+        # Months and years are read from the rollups' unique (user, year, month, ...) key
+        for granularity in ('month', 'year'):
+            self.assertUsesIndexes(lambda: get_series(self.user, 12, granularity, end=date(2025, 12, 31)))
+        cache.clear()
+        self.client.force_login(self.user)
+        self.assertUsesIndexes(
+            lambda: self.client.get(reverse('analytics'), {'granularity': 'week'}), 'txn_user_date_type_idx'
+        )
+
+    def test_month_bounds_are_half_open(self):
+        self.assertEqual(month_bounds(2025, 12), (date(2025, 12, 1), date(2026, 1, 1)))
+
+
+class ImportTransactionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dave', password='secret')
+
+    def test_import_creates_valid_rows_and_reports_errors(self):
+        lines = [
+            'Date,Title,Category,Type,Amount,Description',
+            '2025-03-01,Paycheck,Salary,Income,2500.00,March',
+            '2025-03-02,Lunch,food & dining,expense,12.50,',
+            '2025-03-03,Mystery,Uncategorized,Expense,4,',
+            'not-a-date,Broken,Rent,Expense,10,',
+            '2025-03-04,Typo,Nope,Expense,10,',
+            '2025-03-05,Huge,Rent,Expense,123456789012,',
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_transactions(self.user, lines, batch_size=2)
+
+        self.assertEqual(result['created'], 3)
+        self.assertEqual([line for line, _ in result['errors']], [5, 6, 7])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list('title', 'category__name')),
+            [('Lunch', 'Food & Dining'), ('Mystery', None), ('Paycheck', 'Salary')],
+        )
+        rollup = MonthlyRollup.objects.get(user=self.user, year=2025, month=3, transaction_type='income')
+        self.assertEqual(rollup.total, Decimal('2500.00'))
+
+    def test_only_configured_currencies_are_accepted(self):
+        Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        lines = [
+            'date,title,category,type,amount,currency',
+            '2025-03-01,Hotel,Entertainment,expense,80,eur',
+            '2025-03-02,Souvenir,Shopping,expense,5,XYZ',
+            '2025-03-03,Taxi,Transportation,expense,12,',
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_transactions(self.user, lines)
+        self.assertEqual(result['errors'], [(3, "Unknown currency: 'XYZ'")])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list('title', 'currency')),
+            [('Hotel', 'EUR'), ('Taxi', '')],
+        )
+
+    def test_a_file_that_is_not_utf8_is_reported(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('rows.csv', b'\xff\xfedate,title,category,type,amount\n')
+        response = self.client.post(reverse('import_transactions'), {'file': upload})
+        self.assertContains(response, 'not UTF-8 encoded')
+
+        # Far enough in that earlier batches are written before it is decoded
+        valid = 'date,title,category,type,amount\n' + '2025-03-01,Lunch,Food & Dining,expense,12.50\n' * 500
+        lines = TextIOWrapper(BytesIO(valid.encode() + b'2025-03-02,Caf\xe9,Food & Dining,expense,3\n'), encoding='utf-8', newline='')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_transactions(self.user, lines, batch_size=1)
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(len(result['errors']), 1)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+
+class ExportTransactionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('eve', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.salary = Category.objects.get(user=self.user, name='Salary')
+        self.client.force_login(self.user)
+
+    def add(self, amount, category, transaction_type, day):
+        return Transaction.objects.create(
+            user=self.user, title='t', amount=Decimal(amount), category=category,
+            transaction_type=transaction_type, date=day,
+        )
+
+    def test_export_streams_filtered_rows_in_one_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (1, 2, 3):
+                self.add('5', self.food, 'expense', date(2025, 3, day))
+            self.add('900', self.salary, 'income', date(2025, 3, 4))
+
+        response = self.client.get(reverse('export_transactions'), {'type': 'expense', 'start': '2025-03-02'})
+        with self.assertNumQueries(1):
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(body.splitlines(), [
+            'Date,Title,Category,Type,Amount,Description,Currency,Balance',
+            '2025-03-03,t,Food & Dining,Expense,5.00,,,-15.00',
+            '2025-03-02,t,Food & Dining,Expense,5.00,,,-10.00',
+        ])
+
+
+class RecurringTransactionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('erin', password='secret')
+        self.rent = Category.objects.get(user=self.user, name='Rent')
+
+    def add_rule(self, frequency, start, **kwargs):
+        return RecurringTransaction.objects.create(
+            user=self.user, title=f'{frequency} rule', amount=Decimal('100'), category=self.rent,
+            transaction_type='expense', frequency=frequency, start_date=start, **kwargs
+        )
+
+    def created_dates(self, rule):
+        return list(Transaction.objects.filter(title=rule.title).order_by('date').values_list('date', flat=True))
+
+    def test_add_months_clamps_to_month_end(self):
+        self.assertEqual(add_months(date(2025, 1, 31), 1), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2025, 11, 30), 3), date(2026, 2, 28))
+        self.assertEqual(add_months(date(2024, 2, 29), 12), date(2025, 2, 28))
+
+    def test_due_occurrences_are_created_once(self):
+        monthly = self.add_rule('monthly', date(2025, 1, 31))
+        weekly = self.add_rule('weekly', date(2025, 3, 1), end_date=date(2025, 3, 20))
+        yearly = self.add_rule('yearly', date(2024, 2, 29))
+        self.add_rule('daily', date(2025, 3, 1), is_active=False)
+
+        stats = process_recurring(today=date(2025, 4, 30))
+        self.assertEqual(stats['created'], 4 + 3 + 2)
+        self.assertEqual(self.created_dates(monthly), [
+            date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30),
+        ])
+        self.assertEqual(self.created_dates(weekly), [date(2025, 3, 1), date(2025, 3, 8), date(2025, 3, 15)])
+        self.assertEqual(self.created_dates(yearly), [date(2024, 2, 29), date(2025, 2, 28)])
+
+        # Running again for the same day is a no-op; the next month picks up where it left off
+        self.assertEqual(process_recurring(today=date(2025, 4, 30))['created'], 0)
+        self.assertEqual(process_recurring(today=date(2025, 5, 31), chunk_size=1)['created'], 1)
+        self.assertEqual(self.created_dates(monthly)[-1], date(2025, 5, 31))
+
+
+class SummaryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.user = User.objects.create_user('frank', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.march = Transaction.objects.create(
+                user=self.user, title='March', amount=Decimal('30'), category=self.food,
+                transaction_type='expense', date=date(2025, 3, 10),
+            )
+            Transaction.objects.create(
+                user=self.user, title='April', amount=Decimal('40'), category=self.food,
+                transaction_type='expense', date=date(2025, 4, 10),
+            )
+
+    def test_write_only_evicts_the_touched_month(self):
+        months = [(2025, 3), (2025, 4)]
+        cached_month_summaries(self.user, months)
+        with self.assertNumQueries(0):
+            cached_month_summaries(self.user, months)
+
+        self.march.amount = Decimal('35')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.march.save()
+
+        # Only March is recomputed, from its rollup rows
+        with self.assertNumQueries(1):
+            summaries = cached_month_summaries(self.user, months)
+        self.assertEqual(summaries[(2025, 3)]['month_expense'], Decimal('35'))
+        self.assertEqual(summaries[(2025, 4)]['month_expense'], Decimal('40'))
+        self.assertEqual(cache_stats()['month'], {'hits': 3, 'misses': 3, 'hit_rate': 0.5})
+
+    def test_renaming_a_category_evicts_its_months(self):
+        cached_month_summaries(self.user, [(2025, 3)])
+        self.food.name = 'Eating Out'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.save()
+        breakdown = cached_month_summaries(self.user, [(2025, 3)])[(2025, 3)]['category_breakdown']
+        self.assertEqual(breakdown[0]['category__name'], 'Eating Out')
+
+    def test_summary_totals_follow_writes(self):
+        self.assertEqual(cached_summary(self.user, 2025, 4)['total_expense'], Decimal('70'))
+        with self.assertNumQueries(0):
+            cached_summary(self.user, 2025, 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.march.delete()
+        summary = cached_summary(self.user, 2025, 4)
+        self.assertEqual(summary['total_expense'], Decimal('40'))
+        self.assertEqual(summary['month_expense'], Decimal('40'))
+
+    def test_category_fragments_follow_category_writes(self):
+        other = User.objects.create_user('grace', password='secret')
+        other_versions = fragment_versions(other)
+        self.client.login(username='frank', password='secret')
+        url = reverse('budget_goals')
+        self.client.get(url)
+
+        # The category picker comes from the fragment cache, without its query
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertNotContains(self.client.get(url), 'Pets')
+        self.assertFalse(any('tracker_category' in query['sql'] for query in ctx.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(user=self.user, name='Pets', category_type='expense')
+        self.assertContains(self.client.get(url), 'Pets')
+        self.assertEqual(fragment_versions(other), other_versions)
+
+    def test_breakdown_fragment_follows_transaction_writes(self):
+        self.client.login(username='frank', password='secret')
+        url = reverse('dashboard') + '?month=4&year=2025'
+        self.assertContains(self.client.get(url), '1.125rem;">₹40</div>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, title='More', amount=Decimal('25'), category=self.food,
+                transaction_type='expense', date=date(2025, 4, 20),
+            )
+        self.assertContains(self.client.get(url), '1.125rem;">₹65</div>')
+
+
+class BudgetProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grace', password='secret')
+        self.expense_categories = list(Category.objects.filter(user=self.user, category_type='expense'))
+
+    def test_progress_for_any_month(self):
+        food = Category.objects.get(user=self.user, name='Food & Dining')
+        BudgetGoal.objects.create(user=self.user, category=food, monthly_limit=Decimal('200'))
+        with self.captureOnCommitCallbacks(execute=True):
+            for day, amount in ((3, '50'), (9, '100')):
+                Transaction.objects.create(
+                    user=self.user, title='x', amount=Decimal(amount), category=food,
+                    transaction_type='expense', date=date(2024, 11, day),
+                )
+
+        [item] = get_budget_progress(self.user, 2024, 11)
+        self.assertEqual(item['spent'], Decimal('150'))
+        self.assertEqual(item['remaining'], Decimal('50'))
+        self.assertEqual(item['percentage'], Decimal('75'))
+        self.assertEqual(get_budget_progress(self.user, 2024, 12)[0]['spent'], Decimal('0'))
+
+    def test_query_count_does_not_grow_with_goals(self):
+        for category in self.expense_categories[:1]:
+            BudgetGoal.objects.create(user=self.user, category=category, monthly_limit=Decimal('100'))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_budget_progress(self.user, 2025, 1)), 1)
+
+        for category in self.expense_categories[1:]:
+            BudgetGoal.objects.create(user=self.user, category=category, monthly_limit=Decimal('100'))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_budget_progress(self.user, 2025, 1)), len(self.expense_categories))
+
+
+class SeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('heidi', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            for day, amount, transaction_type in (
+                (date(2024, 12, 31), '10', 'expense'),
+                (date(2025, 1, 1), '20', 'expense'),
+                (date(2025, 3, 3), '500', 'income'),
+                (date(2025, 3, 9), '30', 'expense'),
+            ):
+                Transaction.objects.create(
+                    user=self.user, title='x', amount=Decimal(amount),
+                    transaction_type=transaction_type, date=day,
+                )
+
+    def values(self, series):
+        return [(point['label'], point['income'], point['expense']) for point in series]
+
+    def test_monthly_series_uses_calendar_months(self):
+        with self.assertNumQueries(1):
+            series = get_series(self.user, 4, 'month', end=date(2025, 3, 31))
+        self.assertEqual(self.values(series), [
+            ('Dec 2024', 0, Decimal('10')),
+            ('Jan 2025', 0, Decimal('20')),
+            ('Feb 2025', 0, 0),
+            ('Mar 2025', Decimal('500'), Decimal('30')),
+        ])
+        self.assertEqual(len(get_series(self.user, 24, 'month', end=date(2025, 3, 31))), 24)
+
+    def test_weekly_and_yearly_series(self):
+        with self.assertNumQueries(1):
+            weekly = get_series(self.user, 2, 'week', end=date(2025, 3, 9))
+        self.assertEqual(self.values(weekly), [
+            ('24 Feb 2025', 0, 0),
+            ('03 Mar 2025', Decimal('500'), Decimal('30')),
+        ])
+        self.assertEqual(self.values(get_series(self.user, 2, 'year', end=date(2025, 6, 1))), [
+            ('2024', 0, Decimal('10')),
+            ('2025', Decimal('500'), Decimal('50')),
+        ])
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('ivan', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (1, 1, 2, 3, 3):
+                Transaction.objects.create(
+                    user=self.user, title=f'day {day}', amount=Decimal('10'), category=self.food,
+                    transaction_type='expense', date=date(2025, 5, day),
+                )
+        self.client.force_login(self.user)
+
+    def test_transactions_are_paged_by_cursor(self):
+        expected = list(Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True))
+        seen = []
+        cursor = ''
+        while True:
+            data = self.client.get(reverse('api_transactions'), {'limit': 2, 'cursor': cursor}).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_unchanged_data_answers_not_modified(self):
+        url = reverse('api_summary')
+        response = self.client.get(url, {'year': 2025, 'month': 5})
+        self.assertEqual(Decimal(response.json()['month_expense']), Decimal('50'))
+        etag = response['ETag']
+
+        # Session, user and the data version; nothing is recomputed
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.filter(user=self.user).first().delete()
+        response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['month_expense']), Decimal('40'))
+
+    def test_category_changes_and_a_new_day_change_the_etag(self):
+        url = reverse('api_summary')
+        etag = self.client.get(url, {'year': 2025, 'month': 5})['ETag']
+
+        self.food.name = 'Eating Out'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.save()
+        response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category_breakdown'][0]['name'], 'Eating Out')
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.delete()
+        response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['category_breakdown'][0]['name'])
+
+        # Without ?month= the summary is for the current month, which rolls over
+        etag = self.client.get(url)['ETag']
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_logging_in_keeps_the_etag(self):
+        url = reverse('api_summary')
+        etag = self.client.get(url, {'year': 2025, 'month': 5})['ETag']
+        self.client.logout()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(username='ivan', password='secret'))
+            self.user.save()
+        response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.user.profile.monthly_income = Decimal('2500')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.save()
+        response = self.client.get(url, {'year': 2025, 'month': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_out_of_range_months_are_clamped(self):
+        for params in ({'year': 9999, 'month': 12}, {'year': 0, 'month': 1}, {'year': 2025, 'month': 13}):
+            self.assertEqual(self.client.get(reverse('api_summary'), params).status_code, 200)
+
+    def test_anonymous_requests_are_rejected(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_budget')).status_code, 401)
+
+
+class DashboardPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('judy', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.rent = Category.objects.get(user=self.user, name='Rent')
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(25):
+                Transaction.objects.create(
+                    user=self.user, title=f'row {n}', amount=Decimal('1'),
+                    category=self.food if n % 5 else self.rent, transaction_type='expense',
+                    date=date(2025, 1 + n % 3, 1 + n // 3),
+                )
+        self.client.force_login(self.user)
+
+    def page(self, **params):
+        return self.client.get(reverse('dashboard'), params).context['transactions']
+
+    def test_walks_forward_and_back_in_dashboard_order(self):
+        expected = list(Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True))
+
+        pages = [self.page()]
+        while pages[-1].next_cursor:
+            pages.append(self.page(after=pages[-1].next_cursor))
+        self.assertEqual([t.id for page in pages for t in page], expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+
+        back = self.page(before=pages[-1].previous_cursor)
+        self.assertEqual([t.id for t in back], [t.id for t in pages[1]])
+        first = self.page(before=back.previous_cursor)
+        self.assertEqual([t.id for t in first], [t.id for t in pages[0]])
+        self.assertFalse(first.has_previous)
+
+    def test_filters_apply_to_every_page(self):
+        params = {'category': self.food.id}
+        page = self.page(**params)
+        ids = [t.id for t in page]
+        while page.next_cursor:
+            page = self.page(after=page.next_cursor, **params)
+            ids += [t.id for t in page]
+        self.assertEqual(ids, list(
+            Transaction.objects.filter(user=self.user, category=self.food).order_by('-date', '-id').values_list('id', flat=True)
+        ))
+
+    def test_approximate_count_comes_from_rollups(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(approximate_count(self.user, {}), 25)
+        self.assertEqual(approximate_count(self.user, {'category': str(self.rent.id)}), 5)
+        self.assertEqual(approximate_count(self.user, {'start': '2025-02-10', 'end': '2025-03-01'}), 16)
+        self.assertIsNone(approximate_count(self.user, {'search': 'row'}))
+
+    def test_a_malformed_category_matches_nothing(self):
+        self.assertEqual(approximate_count(self.user, {'category': 'abc'}), 0)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'), {'category': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['transactions']), [])
+        response = self.client.get(reverse('api_transactions'), {'category': 'abc'})
+        self.assertEqual(response.json()['results'], [])
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('kate', password='secret')
+        self.other = User.objects.create_user('leo', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+
+    def add(self, user, title, description='', day=1):
+        return Transaction.objects.create(
+            user=user, title=title, description=description, amount=Decimal('3'),
+            transaction_type='expense', date=date(2025, 6, day),
+        )
+
+    def found(self, text, user=None):
+        user = user or self.user
+        queryset = Transaction.objects.filter(user=user).filter(search_filter(text, user.id))
+        return set(queryset.values_list('title', flat=True))
+
+    def test_index_follows_saves_edits_and_deletes(self):
+        latte = self.add(self.user, 'Caffè latte', 'Morning coffee')
+        self.add(self.user, 'Groceries', 'coffee beans')
+        self.add(self.other, 'Coffee', '')
+
+        self.assertEqual(self.found('coff'), {'Caffè latte', 'Groceries'})
+        self.assertEqual(self.found('caffe'), {'Caffè latte'})
+        self.assertEqual(self.found('coffee bean'), {'Groceries'})
+
+        latte.title = 'Espresso'
+        latte.date = date(2025, 7, 1)
+        latte.save()
+        self.assertEqual(self.found('latte'), set())
+        self.assertEqual(self.found('espr'), {'Espresso'})
+
+        latte.delete()
+        self.assertEqual(self.found('coffee'), {'Groceries'})
+        self.assertEqual(self.found('coffee', self.other), {'Coffee'})
+
+    def test_bulk_imports_are_indexed(self):
+        import_transactions(self.user, [
+            'date,title,category,type,amount,description',
+            '2025-06-01,Bookshop,Food & Dining,expense,12.00,paperbacks',
+        ])
+        self.assertEqual(self.found('paperback'), {'Bookshop'})
+
+    def test_search_combines_with_filters_and_ranks(self):
+        self.add(self.user, 'Taxi', 'taxi to the airport taxi')
+        self.add(self.user, 'Dinner', 'taxi home', day=20)
+        self.client.force_login(self.user)
+
+        results = self.client.get(reverse('api_search'), {'q': 'taxi'}).json()['results']
+        self.assertEqual([row['title'] for row in results], ['Taxi', 'Dinner'])
+        results = self.client.get(reverse('api_search'), {'q': 'taxi', 'start': '2025-06-10'}).json()['results']
+        self.assertEqual([row['title'] for row in results], ['Dinner'])
+
+    def test_rebuild_restores_the_index(self):
+        self.add(self.user, 'Cinema')
+        self.add(self.other, 'Cinema')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM tracker_transaction_fts')
+
+        self.assertEqual(rebuild_search_index(users=[self.user.id]), 1)
+        self.assertEqual(self.found('cinema'), {'Cinema'})
+        self.assertEqual(self.found('cinema', self.other), set())
+        self.assertEqual(rebuild_search_index(), 2)
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ['tracker.profiling.ProfilingMiddleware'])
+class ProfilingTests(TestCase):
+    def setUp(self):
+        reset_profiles()
+        self.user = User.objects.create_user('mia', password='secret', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_requests_are_reported_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('dashboard'))
+        b''.join(self.client.get(reverse('export_transactions')).streaming_content)
+
+        report = self.client.get(reverse('profiling_report'), {'format': 'json'}).json()
+        dashboard = report['dashboard']
+        self.assertEqual(dashboard['requests'], 3)
+        self.assertGreater(dashboard['queries']['p50'], 0)
+        self.assertGreater(dashboard['template_ms']['p50'], 0)
+        self.assertLessEqual(dashboard['wall_ms']['p50'], dashboard['wall_ms']['p99'])
+        # The export's query runs while the response streams
+        self.assertGreaterEqual(report['export_transactions']['queries']['max'], 3)
+        self.assertContains(self.client.get(reverse('profiling_report')), 'export_transactions')
+
+    def test_repeated_statements_count_as_duplicates(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for category in Category.objects.filter(user=self.user)[:3]:
+                Transaction.objects.filter(category=category).count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.duplicates().values()), [3])
+
+    def test_reset_clears_the_report(self):
+        self.client.get(reverse('dashboard'))
+        self.assertIn('dashboard', profile_report())
+        self.client.post(reverse('profiling_report'))
+        self.assertNotIn('dashboard', profile_report())
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+
+# The async pages in place of the synchronous ones, for AsyncViewTests
+urlpatterns = [
+    path('dashboard/', async_views.dashboard, name='dashboard'),
+    path('analytics/', async_views.analytics, name='analytics'),
+    path('budget-goals/', async_views.budget_goals, name='budget_goals'),
+    path('', include('config.urls')),
+]
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('nina', password='secret')
+        food = Category.objects.get(user=self.user, name='Food & Dining')
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(15):
+                Transaction.objects.create(
+                    user=self.user, title=f'meal {n}', amount=Decimal('12.50'), category=food,
+                    transaction_type='expense', date=today.replace(day=1 + n % 10),
+                )
+            BudgetGoal.objects.create(user=self.user, category=food, monthly_limit=Decimal('500'))
+
+    def contexts(self, urlconf):
+        cache.clear()
+        client = self.client_class()
+        client.force_login(self.user)
+        with self.settings(ROOT_URLCONF=urlconf):
+            return [client.get(reverse(name)).context for name in ('dashboard', 'analytics', 'budget_goals')]
+
+    def test_async_pages_render_the_same_data(self):
+        sync_dashboard, sync_analytics, sync_budget = self.contexts('config.urls')
+        dashboard, analytics, budget = self.contexts('tracker.tests')
+
+        for key in ('total_expense', 'monthly_expense', 'category_breakdown', 'total_count', 'expense_percentage'):
+            self.assertEqual(dashboard[key], sync_dashboard[key])
+        self.assertEqual([t.id for t in dashboard['transactions']], [t.id for t in sync_dashboard['transactions']])
+        self.assertEqual(analytics['months_data'], sync_analytics['months_data'])
+        self.assertEqual(analytics['category_data'], sync_analytics['category_data'])
+        self.assertEqual(
+            [(item['spent'], item['percentage']) for item in budget['goals_with_spending']],
+            [(item['spent'], item['percentage']) for item in sync_budget['goals_with_spending']],
+        )
+
+    @override_settings(ROOT_URLCONF='tracker.tests')
+    async def test_served_over_asgi(self):
+        response = await self.async_client.get('/dashboard/')
+        self.assertEqual(response.status_code, 302)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/dashboard/')
+        self.assertContains(response, 'meal 14')
+        self.assertEqual(len(response.context['transactions']), 10)
+
+
+class DefaultCategoryTests(TestCase):
+    def test_registration_creates_each_default_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('register'), {
+                'username': 'olga', 'password1': 'a-Long-passw0rd', 'password2': 'a-Long-passw0rd',
+            })
+        user = User.objects.get(username='olga')
+        names = list(Category.objects.filter(user=user).values_list('name', 'category_type'))
+        self.assertCountEqual(names, DEFAULT_CATEGORIES)
+        inserts = [
+            q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT') and '"tracker_category"' in q['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+
+    def test_duplicates_are_rejected(self):
+        user = User.objects.create_user('pia')
+        with self.assertRaises(IntegrityError):
+            Category.objects.create(user=user, name='Rent', category_type='expense')
+
+    def test_add_category_reports_duplicates(self):
+        user = User.objects.create_user('quinn', password='secret')
+        self.client.force_login(user)
+        response = self.client.post(reverse('add_category'), {'name': 'Rent', 'category_type': 'expense'})
+        self.assertContains(response, 'already have a category')
+        self.assertEqual(Category.objects.filter(user=user, name='Rent').count(), 1)
+
+    def test_backfill_adds_only_missing_categories(self):
+        users = [User.objects.create_user(f'user{n}') for n in range(3)]
+        Category.objects.filter(user=users[0]).delete()
+        Category.objects.filter(user=users[1], name='Rent').delete()
+
+        call_command('create_default_categories', batch_size=2, stdout=StringIO())
+        for user in users:
+            self.assertCountEqual(
+                Category.objects.filter(user=user).values_list('name', 'category_type'), DEFAULT_CATEGORIES
+            )
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        cache.clear()
+        self.user = User.objects.create_user('rosa', password='secret')
+        self.rent = Category.objects.get(user=self.user, name='Rent')
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(5):
+                Transaction.objects.create(
+                    user=self.user, title=f'rent {n}', amount=Decimal('100'), category=self.rent,
+                    transaction_type='expense', date=date(2025, 1 + n, 1),
+                )
+        self.client.force_login(self.user)
+
+    def run_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('run_worker', processes=0, once=True, stdout=StringIO(), stderr=StringIO())
+
+    @override_settings(TRACKER_EXPORT_INLINE_ROWS=3)
+    def test_large_export_is_queued_and_downloadable(self):
+        response = self.client.get(reverse('export_transactions'))
+        job = Job.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('job_detail', args=[job.pk]))
+        # Asking again while it is pending reuses the job
+        self.client.get(reverse('export_transactions'))
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.client.get(reverse('job_download', args=[job.pk])).status_code, 404)
+
+        self.run_worker()
+        status = self.client.get(reverse('job_detail', args=[job.pk]), {'format': 'json'}).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['result'], {'rows': 5})
+
+        lines = b''.join(self.client.get(status['download_url']).streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Date,Title,Category,Type,Amount,Description,Currency,Balance')
+        self.assertEqual(lines[1].split(',')[:2], ['2025-05-01', 'rent 4'])
+        self.assertEqual(len(lines), 6)
+
+        other = User.objects.create_user('sam')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(status['download_url']).status_code, 404)
+
+    @override_settings(TRACKER_IMPORT_INLINE_BYTES=10)
+    def test_large_import_runs_in_the_worker(self):
+        upload = SimpleUploadedFile('rows.csv', (
+            'date,title,category,type,amount\n'
+            '2025-06-01,June rent,Rent,expense,100.00\n'
+            '2025-06-02,Broken,Rent,expense,abc\n'
+        ).encode())
+        response = self.client.post(reverse('import_transactions'), {'file': upload})
+        job = Job.objects.get(user=self.user, kind='import')
+        self.assertRedirects(response, reverse('job_detail', args=[job.pk]))
+        self.assertFalse(Transaction.objects.filter(title='June rent').exists())
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.result['created'], job.result['error_count']), (1, 1))
+        self.assertTrue(Transaction.objects.filter(user=self.user, title='June rent').exists())
+        self.assertContains(self.client.get(reverse('job_detail', args=[job.pk])), 'Line 3')
+        # The upload is not kept once imported
+        self.assertFalse(job.input_file)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'jobs', 'input')), [])
+
+    @override_settings(TRACKER_EXPORT_INLINE_ROWS=3)
+    def test_expired_result_files_are_removed(self):
+        self.client.get(reverse('export_transactions'))
+        self.run_worker()
+        job = Job.objects.get(user=self.user)
+        path = job.result_file.path
+        self.assertTrue(os.path.exists(path))
+
+        # Within the retention period the worker keeps it
+        self.assertEqual(expire_files(), 0)
+        Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=8))
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertFalse(job.result_file)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.client.get(reverse('job_download', args=[job.pk])).status_code, 404)
+
+    def test_rollup_rebuild_and_failures_are_recorded(self):
+        MonthlyRollup.objects.filter(user=self.user).delete()
+        self.client.post(reverse('jobs'))
+        broken = enqueue(self.user, 'export')
+
+        with self.assertLogs('tracker.jobs', 'ERROR'), mock.patch('tracker.jobs.export_rows', side_effect=RuntimeError):
+            self.run_worker()
+        self.assertEqual(MonthlyRollup.objects.filter(user=self.user).count(), 5)
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, 'failed')
+        self.assertIn('Traceback', broken.error)
+
+    def test_a_job_is_claimed_once(self):
+        job = enqueue(self.user, 'rebuild_rollups')
+        self.assertEqual(claim_next(), job.pk)
+        self.assertIsNone(claim_next())
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'running')
+
+
+class DailyBalanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('lena', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.salary = Category.objects.get(user=self.user, name='Salary')
+        self.add('1000', self.salary, 'income', date(2025, 1, 1))
+        self.lunch = self.add('30', self.food, 'expense', date(2025, 1, 5))
+        self.add('20', self.food, 'expense', date(2025, 1, 5))
+        self.add('50', self.food, 'expense', date(2025, 1, 9))
+
+    def add(self, amount, category, transaction_type, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                user=self.user, title='t', amount=Decimal(amount), category=category,
+                transaction_type=transaction_type, date=day,
+            )
+
+    def balances(self):
+        return list(DailyBalance.objects.filter(user=self.user).order_by('date').values_list('date', 'balance'))
+
+    def test_ledger_keeps_running_totals_through_edits(self):
+        self.assertEqual(self.balances(), [
+            (date(2025, 1, 1), Decimal('1000')), (date(2025, 1, 5), Decimal('950')), (date(2025, 1, 9), Decimal('900')),
+        ])
+
+        # A back-dated edit shifts the later days
+        self.lunch.amount = Decimal('130')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lunch.save()
+        self.assertEqual([balance for day, balance in self.balances()], [Decimal('1000'), Decimal('850'), Decimal('800')])
+
+        # Moving it to a new day, then deleting the last transaction of a day
+        self.lunch.date = date(2025, 1, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lunch.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.get(date=date(2025, 1, 9)).delete()
+        self.assertEqual(self.balances(), [
+            (date(2025, 1, 1), Decimal('1000')), (date(2025, 1, 3), Decimal('870')), (date(2025, 1, 5), Decimal('850')),
+        ])
+        self.assertEqual(verify_balances([self.user.id]), [])
+
+    def test_balance_as_of_and_series(self):
+        self.assertIsNone(balance_as_of(self.user, date(2024, 12, 31)))
+        with self.assertNumQueries(1):
+            row = balance_as_of(self.user, date(2025, 1, 7))
+        self.assertEqual((row.running_income, row.running_expense, row.balance), (1000, 50, 950))
+        self.assertEqual(
+            [balance for day, balance in balance_series(self.user, date(2025, 1, 4), date(2025, 1, 10))],
+            [1000, 950, 950, 950, 950, 900, 900],
+        )
+
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('api_balance'), {'date': '2025-01-06', 'start': '2025-01-05'}).json()
+        self.assertEqual(Decimal(data['balance']), Decimal('950'))
+        self.assertEqual([row['date'] for row in data['results']], ['2025-01-05', '2025-01-06'])
+
+        # The ends of the calendar
+        data = self.client.get(reverse('api_balance'), {'date': '0001-01-01', 'start': '0001-01-01'}).json()
+        self.assertEqual(data['results'], [{'date': '0001-01-01', 'balance': '0'}])
+        data = self.client.get(reverse('api_balance'), {'date': '9999-12-31', 'start': '9999-12-30'}).json()
+        self.assertEqual([Decimal(row['balance']) for row in data['results']], [900, 900])
+
+    def test_running_balance_on_keyset_pages(self):
+        self.add('5', self.food, 'expense', date(2025, 1, 5))
+        expected = [Decimal(value) for value in ('895', '945', '950', '970', '1000')]
+        queryset = Transaction.objects.filter(user=self.user).select_related('category')
+        with self.assertNumQueries(1):
+            first = KeysetPage(queryset, per_page=2, annotations={'running_balance': running_balance()})
+        second = KeysetPage(queryset, after=first.next_cursor, per_page=2, annotations={'running_balance': running_balance()})
+        back = KeysetPage(queryset, before=second.next_cursor, per_page=2, annotations={'running_balance': running_balance()})
+        self.assertEqual([row.running_balance for row in [*first, *second]], expected[:4])
+        self.assertEqual([row.running_balance for row in back], expected[1:3])
+        # Other filters do not change the balance after each row
+        expenses = KeysetPage(queryset.filter(transaction_type='expense'), annotations={'running_balance': running_balance()})
+        self.assertEqual([row.running_balance for row in expenses], expected[:4])
+        self.assertEqual(first.object_list[0].category, self.food)
+
+        whole = Transaction.objects.filter(user=self.user).annotate(balance=running_balance(window=True))
+        self.assertEqual(list(whole.order_by('-date', '-id').values_list('balance', flat=True)), expected)
+
+    def test_verify_rebuilds_drifted_ledgers(self):
+        DailyBalance.objects.filter(user=self.user, date=date(2025, 1, 5)).update(balance=0)
+        self.assertEqual(verify_balances([self.user.id]), [self.user.id])
+
+        out, err = StringIO(), StringIO()
+        call_command('rebuild_balances', verify=True, stdout=out, stderr=err)
+        self.assertIn(f'user {self.user.id} differs', err.getvalue())
+        self.assertEqual(verify_balances([self.user.id]), [])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='secret')
+        self.client.force_login(self.admin)
+
+    def add_transactions(self, username, days):
+        user = User.objects.create_user(username, password='secret')
+        food = Category.objects.get(user=user, name='Food & Dining')
+        Transaction.objects.bulk_create([
+            Transaction(user=user, title='Lunch', amount=Decimal('5'), category=food, transaction_type='expense', date=day)
+            for day in days
+        ])
+
+    def changelist_query_count(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:tracker_transaction_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_transaction_changelist_queries_do_not_grow_with_rows(self):
+        self.add_transactions('ana', [date(2024, 3, 1), date(2025, 1, 5)])
+        baseline = self.changelist_query_count({})
+        for n in range(5):
+            self.add_transactions(f'user{n}', [date(2024, 3, 1 + n), date(2025, 1, 5)])
+        self.assertEqual(self.changelist_query_count({}), baseline)
+        self.changelist_query_count({'date__year': 2024, 'transaction_type__exact': 'expense', 'q': 'lunch'})
+
+    def test_drilldown_matches_distinct_dates(self):
+        self.add_transactions('ana', [date(2023, 12, 31), date(2024, 2, 29), date(2024, 3, 1), date(2024, 3, 1)])
+        drilldown = DrilldownQuerySet(Transaction)
+        for kind in ('year', 'month', 'day'):
+            self.assertEqual(drilldown.dates('date', kind), list(Transaction.objects.dates('date', kind)))
+        self.assertEqual(
+            drilldown.filter(date__year=2024).dates('date', 'month', 'DESC'), [date(2024, 3, 1), date(2024, 2, 1)]
+        )
+        self.assertEqual(drilldown.aggregate(first=Min('date'), last=Max('date')), {
+            'first': date(2023, 12, 31), 'last': date(2024, 3, 1),
+        })
+        self.assertEqual(drilldown.none().dates('date', 'year'), [])
+
+
+class ForecastTests(TestCase):
+    def test_projection_follows_when_in_the_month_money_is_spent(self):
+        start, today = date(2025, 3, 1), date(2025, 6, 10)
+        days = (today - start).days + 1
+        rent = [1000.0 if (start + timedelta(days=n)).day == 1 else 0.0 for n in range(days)]
+        self.assertEqual(project_month(rent, start, today), (1000.0, 1000.0))
+
+        # 21, 20 and 21 days left after the 10th in March, April and May
+        spent, projected = project_month([10.0] * days, start, today)
+        self.assertEqual(spent, 100.0)
+        self.assertAlmostEqual(projected, 100 + 620 / 3)
+
+    def test_find_outliers_flags_only_unusually_large_amounts(self):
+        values = [10, 11, 12, 10, 11, 12, 10, 11, 200, 1]
+        typical, flagged = find_outliers(values)
+        self.assertEqual(typical, 11)
+        self.assertEqual([index for index, score in flagged], [8])
+        self.assertEqual(find_outliers(values[:5]), (None, []))
+        self.assertEqual(find_outliers([10] * 10), (10, []))
+
+    def test_compute_forecasts_feeds_the_dashboard(self):
+        user = User.objects.create_user('ines', password='secret')
+        groceries = Category.objects.get(user=user, name='Groceries')
+        BudgetGoal.objects.create(user=user, category=groceries, monthly_limit=Decimal('250'))
+        today = timezone.localdate()
+        start = add_months(today.replace(day=1), -3)
+        rows = [
+            Transaction(user=user, title='Veg', amount=Decimal(8 + n % 5), category=groceries,
+                        transaction_type='expense', date=start + timedelta(days=n))
+            for n in range((today - start).days)
+        ]
+        rows.append(Transaction(user=user, title='Party', amount=Decimal('500'), category=groceries,
+                                transaction_type='expense', date=today))
+        Transaction.objects.bulk_create(rows)
+
+        self.assertEqual(compute_forecasts(processes=0), (2, 1))
+        forecast = SpendingForecast.objects.get(user=user, category=groceries)
+        self.assertEqual(forecast.spent, sum(row.amount for row in rows if row.date.month == today.month))
+        self.assertTrue(forecast.over_budget)
+        self.assertEqual(TransactionAnomaly.objects.get().transaction.title, 'Party')
+        # Recomputing replaces rather than adds
+        compute_forecasts(processes=0)
+        self.assertEqual(SpendingForecast.objects.filter(user=user).count(), 2)
+
+        cache.clear()
+        self.client.force_login(user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'On track to exceed budget')
+        self.assertContains(response, 'Unusual', count=1)
+
+
+class DatabaseProfileTests(TestCase):
+    @override_settings(TRACKER_SQLITE_PRAGMAS={'busy_timeout': 12345, 'cache_size': -4000})
+    def test_sqlite_pragmas_are_applied_to_new_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            original = cursor.execute('PRAGMA busy_timeout').fetchone()[0]
+            try:
+                configure_sqlite(sender=None, connection=connection)
+                self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 12345)
+                self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -4000)
+            finally:
+                cursor.execute(f'PRAGMA busy_timeout = {original}')
+
+
+class FakeDataTests(TestCase):
+    def test_generated_data_is_consistent(self):
+        user = User.objects.create_user('nina', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = generate_user_data(user, transactions=300, categories=2, budgets=3, recurring=4, seed=1)
+
+        self.assertEqual(counts, {'transactions': 300, 'budgets': 3, 'recurring': 4})
+        self.assertEqual(Transaction.objects.filter(user=user).count(), 300)
+        self.assertEqual(Category.objects.filter(user=user, name__startswith='Custom ').count(), 2)
+        self.assertEqual(BudgetGoal.objects.filter(user=user).count(), 3)
+        # Listeners saw the bulk insert
+        self.assertEqual(MonthlyRollup.objects.filter(user=user).aggregate(n=Sum('count'))['n'], 300)
+
+    def test_compare_flags_slower_cases_and_extra_queries(self):
+        baseline = {'results': {'1000': {
+            'dashboard': {'median_ms': 10.0, 'queries': 5},
+            'analytics': {'median_ms': 10.0, 'queries': 5},
+            'export_transactions': {'median_ms': 10.0, 'queries': 5},
+        }}}
+        report = {'results': {'1000': {
+            'dashboard': {'median_ms': 13.0, 'queries': 5},
+            'analytics': {'median_ms': 10.5, 'queries': 6},
+            'export_transactions': {'median_ms': 5.0, 'queries': 5},
+            'import': {'median_ms': 50.0, 'queries': 9},
+        }}}
+        statuses = {row['case']: row['status'] for row in compare(report, baseline, tolerance=0.2)}
+        self.assertEqual(statuses, {
+            'dashboard': 'regression',
+            'analytics': 'regression',
+            'export_transactions': 'improvement',
+        })
+
+
+class CurrencyConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('omar', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        profile = self.user.profile
+        profile.currency = 'INR'
+        profile.save()
+        # Rates are quoted in USD, the base currency
+        load_rates([
+            (date(2025, 1, 1), 'INR', Decimal('0.0125')),
+            (date(2025, 1, 1), 'EUR', Decimal('1.10')),
+            (date(2025, 3, 15), 'EUR', Decimal('1.20')),
+        ])
+
+    def add(self, amount, currency, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, title='t', amount=Decimal(amount), currency=currency, category=self.food,
+                transaction_type='expense', date=day,
+            )
+
+    def test_aggregates_convert_at_the_rate_on_the_transaction_date(self):
+        self.add('100', '', date(2025, 3, 1))
+        self.add('100', 'INR', date(2025, 3, 2))
+        self.add('10', 'USD', date(2025, 3, 3))
+        self.add('10', 'EUR', date(2025, 3, 10))
+        self.add('10', 'EUR', date(2025, 3, 20))
+        expected = Decimal('100') + Decimal('100') + Decimal('800') + Decimal('880') + Decimal('960')
+
+        self.assertEqual(get_summary(self.user, 2025, 3)['month_expense'], expected)
+        self.assertEqual(MonthlyRollup.objects.get(user=self.user).total, expected)
+        series = get_series(self.user, periods=1, granularity='week', end=date(2025, 3, 20))
+        self.assertEqual(series[0]['expense'], Decimal('960'))
+
+    def test_new_rates_and_currency_changes_re_aggregate(self):
+        self.add('10', 'GBP', date(2025, 3, 3))
+        # No GBP rate yet: counted as is
+        self.assertEqual(MonthlyRollup.objects.get(user=self.user).total, Decimal('10'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(load_rates([(date(2025, 1, 1), 'GBP', Decimal('1.25'))]), (1, 1))
+        self.assertEqual(MonthlyRollup.objects.get(user=self.user).total, Decimal('1000'))
+
+        profile = self.user.profile
+        profile.currency = 'EUR'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(MonthlyRollup.objects.get(user=self.user).total, Decimal('11.36'))
+
+    def test_profile_settings_change_the_currency(self):
+        Currency.objects.create(code='USD', name='US Dollar', symbol='$')
+        self.client.force_login(self.user)
+        self.client.post(reverse('profile_settings'), {'monthly_income': '100', 'currency': 'USD'})
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.currency, 'USD')
+
+    def test_rate_table_looks_up_by_date_and_evicts_least_recently_used(self):
+        table = RateTable(maxsize=1)
+        self.assertIsNone(table.rate('EUR', date(2024, 12, 31)))
+        self.assertEqual(table.rate('EUR', date(2025, 3, 14)), Decimal('1.10'))
+        self.assertEqual(table.rate('EUR', date(2025, 3, 15)), Decimal('1.20'))
+        self.assertEqual(table.convert(Decimal('10'), 'EUR', 'INR', date(2025, 3, 20)), Decimal('960.00'))
+
+        # INR pushed EUR out; the lookup above needed both
+        self.assertEqual(list(table._series), ['INR'])
+        with self.assertNumQueries(1):
+            table.rate('EUR', date(2025, 3, 20))
+            table.rate('EUR', date(2025, 3, 21))
+
+
+class BulkEditTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('nina', password='secret')
+        self.other = User.objects.create_user('omar', password='secret')
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.rent = Category.objects.get(user=self.user, name='Rent')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.coffees = [
+                Transaction.objects.create(
+                    user=self.user, title='Coffee', amount=Decimal('4'), category=self.food,
+                    transaction_type='expense', date=date(2025, month, 3),
+                )
+                for month in (3, 4)
+            ]
+            self.lunch = Transaction.objects.create(
+                user=self.user, title='Lunch', amount=Decimal('12'), category=self.food,
+                transaction_type='expense', date=date(2025, 4, 3),
+            )
+            self.theirs = Transaction.objects.create(
+                user=self.other, title='Coffee', amount=Decimal('5'), transaction_type='expense', date=date(2025, 4, 3),
+            )
+        self.client.force_login(self.user)
+
+    def post(self, name, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse(name), data)
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('UPDATE "tracker_transaction"', 'DELETE FROM "tracker_transaction"'))
+        ]
+        return response, writes
+
+    def test_recategorize_by_filter_is_one_update(self):
+        cached_summary(self.user, 2025, 4)
+        response, writes = self.post('bulk_recategorize', {
+            'select': 'all', 'search': 'coffee', 'new_category': self.rent.id, 'month': 4, 'year': 2025,
+        })
+        self.assertRedirects(
+            response, reverse('dashboard') + '?month=4&year=2025&search=coffee', fetch_redirect_response=False,
+        )
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(Transaction.objects.filter(category=self.rent).count(), 2)
+        self.theirs.refresh_from_db()
+        self.assertIsNone(self.theirs.category)
+
+        # Rollups and the cached month already show the move
+        self.assertEqual(
+            MonthlyRollup.objects.get(user=self.user, year=2025, month=4, category=self.rent).total, Decimal('4'),
+        )
+        breakdown = cached_summary(self.user, 2025, 4)['category_breakdown']
+        self.assertEqual({row['category__name']: row['total'] for row in breakdown}, {
+            'Food & Dining': Decimal('12'), 'Rent': Decimal('4'),
+        })
+
+    def test_change_type_updates_the_ledger(self):
+        _, writes = self.post('bulk_change_type', {'ids': [self.lunch.id, self.theirs.id], 'new_type': 'income'})
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(Transaction.objects.filter(transaction_type='income').count(), 1)
+        self.assertEqual(balance_as_of(self.user, date(2025, 4, 30)).balance, Decimal('4'))
+
+    def test_delete_cleans_up_index_and_anomalies(self):
+        TransactionAnomaly.objects.create(
+            transaction=self.coffees[0], user=self.user, score=5, typical_amount=Decimal('1'), computed_at=timezone.now(),
+        )
+        _, writes = self.post('bulk_delete', {'select': 'all', 'search': 'coffee'})
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(list(Transaction.objects.filter(user=self.user)), [self.lunch])
+        self.assertFalse(TransactionAnomaly.objects.exists())
+        self.assertEqual(Transaction.objects.filter(search_filter('coffee')).get(), self.theirs)
+        self.assertEqual(balance_as_of(self.user, date(2025, 4, 30)).balance, Decimal('-12'))
+
+    def test_nothing_selected_changes_nothing(self):
+        # Without select=all the filters are only carried back to the dashboard
+        _, writes = self.post('bulk_delete', {'search': 'coffee'})
+        self.assertEqual(writes, [])
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertEqual(self.client.get(reverse('bulk_delete')).status_code, 405)
+
+    def test_malformed_categories_change_nothing(self):
+        other_category = Category.objects.filter(user=self.other).first()
+        for data in (
+            {'ids': [self.lunch.id], 'new_category': 'abc'},
+            {'ids': [self.lunch.id], 'new_category': other_category.id},
+            {'select': 'all', 'category': 'abc', 'new_category': self.rent.id},
+        ):
+            response, writes = self.post('bulk_recategorize', data)
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(writes, [])
+        _, writes = self.post('bulk_delete', {'select': 'all', 'category': 'abc'})
+        self.assertEqual(writes, [])
+        self.assertEqual(Transaction.objects.count(), 4)
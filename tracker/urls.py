@@ -1,19 +1,38 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Async versions of the read-heavy pages when serving over ASGI
+read_views = async_views if settings.TRACKER_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('register/', views.register, name='register'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', read_views.dashboard, name='dashboard'),
     path('set-income/', views.set_income, name='set_income'),
     path('add-transaction/', views.add_transaction, name='add_transaction'),
     path('edit-transaction/<int:pk>/', views.edit_transaction, name='edit_transaction'),
     path('delete-transaction/<int:pk>/', views.delete_transaction, name='delete_transaction'),
+    path('transactions/bulk/recategorize/', views.bulk_recategorize, name='bulk_recategorize'),
+    path('transactions/bulk/type/', views.bulk_change_type, name='bulk_change_type'),
+    path('transactions/bulk/delete/', views.bulk_delete, name='bulk_delete'),
     path('add-category/', views.add_category, name='add_category'),
     path('logout/', views.logout_view, name='logout'),
     path('export/', views.export_transactions, name='export_transactions'),
-    path('analytics/', views.analytics, name='analytics'),
-    path('budget-goals/', views.budget_goals, name='budget_goals'),
+    path('import/', views.import_transactions, name='import_transactions'),
+    path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    path('analytics/', read_views.analytics, name='analytics'),
+    path('budget-goals/', read_views.budget_goals, name='budget_goals'),
     path('add-budget-goal/', views.add_budget_goal, name='add_budget_goal'),
     path('profile-settings/', views.profile_settings, name='profile_settings'),
+    path('cache-stats/', views.cache_statistics, name='cache_statistics'),
+    path('profiling/', views.profiling_report, name='profiling_report'),
+    path('api/transactions/', api.transactions, name='api_transactions'),
+    path('api/search/', api.search, name='api_search'),
+    path('api/summary/', api.summary, name='api_summary'),
+    path('api/series/', api.series, name='api_series'),
+    path('api/budget/', api.budget, name='api_budget'),
+    path('api/balance/', api.balance, name='api_balance'),
 ]
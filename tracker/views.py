@@ -1,16 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login, logout as auth_logout
 from django.contrib.auth.forms import UserCreationForm
-from django.db.models import Sum, Q
+from django.db.models import F
+from django.conf import settings
 from django.contrib import messages
 from django.utils import timezone
-from django.core.paginator import Paginator
-from django.http import HttpResponse
-from datetime import datetime, timedelta
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from urllib.parse import urlencode
+from datetime import MAXYEAR, MINYEAR
 import csv
-from .models import Transaction, Category, UserProfile, BudgetGoal, Currency
-from .forms import TransactionForm, CategoryForm
+import io
+from .models import Transaction, Category, BudgetGoal, Currency, Job, SpendingForecast
+from .balances import running_balance
+from .bulk import MAX_SELECTED_IDS, change_type, delete_transactions, recategorize, select_transactions
+from .currency import rates
+from .forms import TransactionForm, CategoryForm, ImportTransactionsForm
+from .exporters import export_rows
+from .importers import import_transactions as run_import
+from .jobs import enqueue
+from .pagination import KeysetPage
+from .profiling import profile_report, reset_profiles
+from .services import MAX_SERIES_PERIODS, SERIES_GRANULARITIES, approximate_count, filter_transactions, get_series
+from .cache import (
+    cached_summary, cached_month_summaries, cached_budget_progress, cached_profile, cache_stats, fragment_versions,
+)
+
+IMPORT_BATCH_SIZE = 1000
+
+MONTHS = [
+    (1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'),
+    (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'),
+    (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')
+]
 
 def home(request):
     if request.user.is_authenticated:
@@ -24,88 +49,60 @@ def register(request):
             user = form.save()
             login(request, user)
             
-            # Create default categories
-            default_categories = [
-                ('Salary', 'income'),
-                ('Freelance', 'income'),
-                ('Investment', 'income'),
-                ('Groceries', 'expense'),
-                ('Transport', 'expense'),
-                ('Shopping', 'expense'),
-                ('Entertainment', 'expense'),
-                ('Bills', 'expense'),
-            ]
-            
-            for name, cat_type in default_categories:
-                Category.objects.create(user=user, name=name, category_type=cat_type)
-            
+            # Default categories are added along with the user (see tracker.models)
             messages.success(request, 'Welcome to MoneyMap! Default categories have been created for you.')
             return redirect('set_income')
     else:
         form = UserCreationForm()
     return render(request, 'tracker/register.html', {'form': form})
 
-@login_required
-def dashboard(request):
-    # Get filter parameters
-    category_filter = request.GET.get('category', '')
-    type_filter = request.GET.get('type', '')
-    search_query = request.GET.get('search', '')
-    month_filter = request.GET.get('month', '')
-    year_filter = request.GET.get('year', '')
-    
-    # Get current month and year
+def selected_month(request):
+    """(year, month) picked in the filters, defaulting to the current month when missing or invalid."""
     now = timezone.now()
-    current_month = int(month_filter) if month_filter else now.month
-    current_year = int(year_filter) if year_filter else now.year
-    
-    # Base queryset
-    all_transactions = Transaction.objects.filter(user=request.user).order_by('-date', '-id')
-    
-    # Apply filters
-    if category_filter:
-        all_transactions = all_transactions.filter(category_id=category_filter)
-    
-    if type_filter:
-        all_transactions = all_transactions.filter(transaction_type=type_filter)
-    
-    if search_query:
-        all_transactions = all_transactions.filter(
-            Q(title__icontains=search_query) | 
-            Q(description__icontains=search_query)
-        )
-    
-    # Current month transactions
-    monthly_transactions = Transaction.objects.filter(
-        user=request.user,
-        date__year=current_year,
-        date__month=current_month
+    try:
+        year = int(request.GET.get('year') or now.year)
+        month = int(request.GET.get('month') or now.month)
+    except ValueError:
+        return now.year, now.month
+    # The month and the ones either side of it must be real dates
+    if not (MINYEAR < year < MAXYEAR and 1 <= month <= 12):
+        return now.year, now.month
+    return year, month
+
+def dashboard_transactions(request, user):
+    """The dashboard list's filtered queryset, before pagination."""
+    return filter_transactions(
+        Transaction.objects.filter(user=user).select_related('category', 'anomaly').order_by('-date', '-id'),
+        request.GET,
+        user.id,
     )
+
+def convert_foreign_amounts(transactions, currency):
+    # Foreign-currency rows also show their value in the profile currency
+    for item in transactions:
+        if item.currency and item.currency != currency:
+            item.converted_amount = rates.convert(item.amount, item.currency, currency, item.date)
+
+def month_forecasts(user, year, month):
+    """
+    The month's pre-computed forecasts (see tracker.forecasting), overall
+    first. Only the current month is projected, so other months skip the query.
+    """
+    today = timezone.localdate()
+    if (year, month) != (today.year, today.month):
+        return SpendingForecast.objects.none()
+    return SpendingForecast.objects.filter(user=user, year=year, month=month).select_related('category').order_by(
+        F('category__name').asc(nulls_first=True)
+    )
+
+def dashboard_context(request, summary, profile, transactions, total_count, categories, fragments, forecasts=()):
+    current_year, current_month = selected_month(request)
+    monthly_expense = summary['month_expense']
+    now = timezone.now()
     
-    # Calculate totals
-    total_income = Transaction.objects.filter(
-        user=request.user, 
-        transaction_type='income'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    total_expense = Transaction.objects.filter(
-        user=request.user, 
-        transaction_type='expense'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    monthly_expense = monthly_transactions.filter(
-        transaction_type='expense'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Category-wise breakdown for current month
-    category_breakdown = monthly_transactions.filter(
-        transaction_type='expense'
-    ).values('category__name').annotate(
-        total=Sum('amount')
-    ).order_by('-total')
-    
-    # Get profile
-    profile = request.user.profile
+    # Written by `manage.py compute_forecasts`; empty until it has run for this month
+    forecast = next((item for item in forecasts if item.category_id is None), None)
+    category_forecasts = [item for item in forecasts if item.category_id is not None]
     
     # Balance calculation
     balance = profile.monthly_income - monthly_expense
@@ -116,133 +113,215 @@ def dashboard(request):
     else:
         expense_percentage = 0
     
-    # Pagination
-    paginator = Paginator(all_transactions, 10)  # 10 transactions per page
-    page_number = request.GET.get('page')
-    transactions = paginator.get_page(page_number)
-    
-    # Get all categories for filter dropdown
-    categories = Category.objects.filter(user=request.user)
-    
-    # Generate month/year options
-    months = [
-        (1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'),
-        (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'),
-        (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')
-    ]
-    years = range(now.year - 2, now.year + 1)
-    
-    context = {
+    return {
         'transactions': transactions,
-        'total_income': total_income,
-        'total_expense': total_expense,
+        'total_count': total_count,
+        'total_income': summary['total_income'],
+        'total_expense': summary['total_expense'],
         'monthly_expense': monthly_expense,
         'balance': balance,
         'monthly_income': profile.monthly_income,
         'expense_percentage': expense_percentage,
-        'category_breakdown': category_breakdown,
+        'category_breakdown': summary['category_breakdown'],
+        'forecast': forecast,
+        'category_forecasts': category_forecasts,
         'categories': categories,
-        'months': months,
-        'years': years,
+        'fragments': fragments,
+        'months': MONTHS,
+        'years': range(now.year - 2, now.year + 1),
         'selected_month': current_month,
         'selected_year': current_year,
-        'selected_category': category_filter,
-        'selected_type': type_filter,
-        'search_query': search_query,
+        'selected_category': request.GET.get('category', ''),
+        'selected_type': request.GET.get('type', ''),
+        'search_query': request.GET.get('search', ''),
     }
+
+@login_required
+def dashboard(request):
+    current_year, current_month = selected_month(request)
+    
+    # Read before the data, so a write landing in between retires whatever is cached here
+    fragments = fragment_versions(request.user)
+    
+    # Totals and category breakdown in a single query
+    summary = cached_summary(request.user, current_year, current_month)
+    profile = cached_profile(request.user)
+    
+    # Keyset pagination: no COUNT(*) and no OFFSET, however deep the page
+    transactions = KeysetPage(
+        dashboard_transactions(request, request.user),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=10,
+        annotations={'running_balance': running_balance()},
+    )
+    total_count = approximate_count(request.user, request.GET)
+    convert_foreign_amounts(transactions, profile.currency)
+    
+    # Only evaluated when the cached category filter has to be rendered again
+    categories = Category.objects.filter(user=request.user)
+    forecasts = list(month_forecasts(request.user, current_year, current_month))
+    
+    context = dashboard_context(request, summary, profile, transactions, total_count, categories, fragments, forecasts)
     return render(request, 'tracker/dashboard.html', context)
 
+class Echo:
+    """File-like object that hands each written CSV line straight back."""
+    def write(self, value):
+        return value
+
 @login_required
 def export_transactions(request):
-    # Get all transactions for the user
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
+    # Large exports are written by the background worker instead of this request
+    limit = settings.TRACKER_EXPORT_INLINE_ROWS
+    rows = approximate_count(request.user, request.GET)
+    if limit is not None and rows is not None and rows > limit:
+        params = request.GET.dict()
+        job = Job.objects.filter(
+            user=request.user, kind='export', params=params, status__in=['queued', 'running']
+        ).first() or enqueue(request.user, 'export', params)
+        messages.info(request, f'Your export of {rows} transactions is being prepared.')
+        return redirect('job_detail', pk=job.pk)
+    
+    writer = csv.writer(Echo())
+    
+    # Stream the CSV so memory stays flat regardless of history size
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(request.user, request.GET)),
+        content_type='text/csv',
+    )
     response['Content-Disposition'] = 'attachment; filename="moneymap_transactions.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Title', 'Category', 'Type', 'Amount', 'Description'])
-    
-    for transaction in transactions:
-        writer.writerow([
-            transaction.date.strftime('%Y-%m-%d'),
-            transaction.title,
-            transaction.category.name if transaction.category else 'Uncategorized',
-            transaction.transaction_type.capitalize(),
-            transaction.amount,
-            transaction.description
-        ])
-    
     return response
 
 @login_required
-def analytics(request):
-    now = timezone.now()
+def import_transactions(request):
+    result = None
+    if request.method == 'POST':
+        form = ImportTransactionsForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            if upload.size > settings.TRACKER_IMPORT_INLINE_BYTES:
+                job = enqueue(request.user, 'import', input_file=upload)
+                messages.info(request, 'Your file is being imported.')
+                return redirect('job_detail', pk=job.pk)
+            
+            # Decode the upload as a stream rather than reading it into memory
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = run_import(request.user, lines, batch_size=IMPORT_BATCH_SIZE)
+            if result['created']:
+                messages.success(request, f"Imported {result['created']} transactions!")
+            if not result['errors']:
+                return redirect('dashboard')
+    else:
+        form = ImportTransactionsForm()
     
-    # Last 6 months data for chart
-    months_data = []
-    for i in range(5, -1, -1):
-        month_date = now - timedelta(days=30*i)
-        month_transactions = Transaction.objects.filter(
-            user=request.user,
-            date__year=month_date.year,
-            date__month=month_date.month
-        )
-        
-        income = month_transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expense = month_transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        months_data.append({
-            'month': month_date.strftime('%b %Y'),
-            'income': float(income),
-            'expense': float(expense)
+    context = {
+        'form': form,
+        'result': result,
+    }
+    return render(request, 'tracker/import_transactions.html', context)
+
+@login_required
+def jobs(request):
+    if request.method == 'POST':
+        job = enqueue(request.user, 'rebuild_rollups')
+        messages.info(request, 'Your totals are being recalculated.')
+        return redirect('job_detail', pk=job.pk)
+    
+    recent = Job.objects.filter(user=request.user)[:20]
+    return render(request, 'tracker/jobs.html', {'jobs': recent})
+
+@login_required
+def job_detail(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'kind': job.kind,
+            'status': job.status,
+            'result': job.result,
+            'error': job.error if job.status == 'failed' else '',
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'download_url': reverse('job_download', args=[job.pk]) if job.result_file else None,
         })
+    return render(request, 'tracker/job_detail.html', {'job': job})
+
+@login_required
+def job_download(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user, status='done')
+    if not job.result_file:
+        raise Http404('This job has no file')
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename='moneymap_transactions.csv')
+
+def analytics_options(request):
+    """The (granularity, periods) pair asked for, falling back to six months."""
+    granularity = request.GET.get('granularity', 'month')
+    if granularity not in SERIES_GRANULARITIES:
+        granularity = 'month'
+    try:
+        periods = min(max(int(request.GET.get('periods', 6)), 1), MAX_SERIES_PERIODS)
+    except ValueError:
+        periods = 6
+    return granularity, periods
+
+def analytics_context(series, summary, granularity, periods):
+    # Income vs expense per calendar period
+    months_data = [
+        {
+            'month': point['label'],
+            'income': float(point['income']),
+            'expense': float(point['expense'])
+        }
+        for point in series
+    ]
     
     # Category-wise data
-    category_data = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='expense',
-        date__year=now.year,
-        date__month=now.month
-    ).values('category__name').annotate(total=Sum('amount')).order_by('-total')[:5]
+    category_data = [
+        {'category__name': item['category__name'], 'total': float(item['total'])}
+        for item in summary['category_breakdown'][:5]
+    ]
     
-    context = {
+    return {
         'months_data': months_data,
-        'category_data': list(category_data),
+        'category_data': category_data,
+        'granularity': granularity,
+        'periods': periods,
     }
-    return render(request, 'tracker/analytics.html', context)
 
 @login_required
-def budget_goals(request):
-    goals = BudgetGoal.objects.filter(user=request.user).select_related('category')
-    
-    # Calculate spending for each goal
+def analytics(request):
     now = timezone.now()
-    goals_with_spending = []
+    granularity, periods = analytics_options(request)
     
-    for goal in goals:
-        spent = Transaction.objects.filter(
-            user=request.user,
-            category=goal.category,
-            transaction_type='expense',
-            date__year=now.year,
-            date__month=now.month
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        percentage = (spent / goal.monthly_limit * 100) if goal.monthly_limit > 0 else 0
-        
-        goals_with_spending.append({
-            'goal': goal,
-            'spent': spent,
-            'remaining': goal.monthly_limit - spent,
-            'percentage': min(percentage, 100)
-        })
+    # One grouped query for the series, the current month from the rollups
+    series = get_series(request.user, periods, granularity)
+    summary = cached_month_summaries(request.user, [(now.year, now.month)])[(now.year, now.month)]
     
-    context = {
+    context = analytics_context(series, summary, granularity, periods)
+    return render(request, 'tracker/analytics.html', context)
+
+def budget_goals_context(request, goals_with_spending, categories, fragments):
+    current_year, current_month = selected_month(request)
+    now = timezone.now()
+    return {
         'goals_with_spending': goals_with_spending,
-        'categories': Category.objects.filter(user=request.user, category_type='expense')
+        'categories': categories,
+        'fragments': fragments,
+        'months': MONTHS,
+        'years': range(now.year - 2, now.year + 1),
+        'selected_month': current_month,
+        'selected_year': current_year,
     }
+
+@login_required
+def budget_goals(request):
+    current_year, current_month = selected_month(request)
+    fragments = fragment_versions(request.user)
+    goals_with_spending = cached_budget_progress(request.user, current_year, current_month)
+    categories = Category.objects.filter(user=request.user, category_type='expense')
+    
+    context = budget_goals_context(request, goals_with_spending, categories, fragments)
     return render(request, 'tracker/budget_goals.html', context)
 
 @login_required
@@ -271,13 +350,13 @@ def profile_settings(request):
     
     if request.method == 'POST':
         monthly_income = request.POST.get('monthly_income')
-        currency_id = request.POST.get('currency')
+        currency_code = request.POST.get('currency')
         
         if monthly_income:
             profile.monthly_income = monthly_income
         
-        if currency_id:
-            profile.currency_id = currency_id
+        if currency_code and currencies.filter(code=currency_code).exists():
+            profile.currency = currency_code
         
         profile.save()
         messages.success(request, 'Profile updated successfully!')
@@ -344,6 +423,65 @@ def delete_transaction(request, pk):
         return redirect('dashboard')
     return render(request, 'tracker/delete_transaction.html', {'transaction': transaction})
 
+def bulk_selection(request):
+    """
+    The transactions a bulk form picked: the ``ids`` ticked, or with
+    ``select=all`` every one matching the dashboard filters it carries.
+    Adds an error message and returns ``None`` when nothing usable was picked.
+    """
+    ids = [value for value in request.POST.getlist('ids') if value.isdigit()]
+    if len(ids) > MAX_SELECTED_IDS:
+        messages.error(request, f'Select at most {MAX_SELECTED_IDS} transactions, or use a filter.')
+        return None
+    params = request.POST if request.POST.get('select') == 'all' else None
+    selection = select_transactions(request.user, ids, params)
+    if selection is None:
+        messages.error(request, 'No transactions selected.')
+    return selection
+
+def bulk_redirect(request):
+    # Back to the dashboard page and filters the form was sent from
+    params = {name: request.POST[name] for name in ('month', 'year', 'category', 'type', 'search') if request.POST.get(name)}
+    return redirect(reverse('dashboard') + ('?' + urlencode(params) if params else ''))
+
+@login_required
+@require_POST
+def bulk_recategorize(request):
+    selection = bulk_selection(request)
+    new_category = request.POST.get('new_category', '')
+    # Blank is "Uncategorized"
+    category = None
+    if new_category:
+        category = Category.objects.filter(user=request.user, id=new_category).first() if new_category.isdigit() else None
+        if category is None:
+            messages.error(request, 'Choose one of your categories.')
+            return bulk_redirect(request)
+    if selection is not None:
+        updated = recategorize(request.user, selection, category)
+        messages.success(request, f"Moved {updated} transactions to {category.name if category else 'Uncategorized'}.")
+    return bulk_redirect(request)
+
+@login_required
+@require_POST
+def bulk_change_type(request):
+    selection = bulk_selection(request)
+    new_type = request.POST.get('new_type', '')
+    if new_type not in dict(Transaction.TRANSACTION_TYPES):
+        messages.error(request, 'Choose income or expense.')
+    elif selection is not None:
+        updated = change_type(request.user, selection, new_type)
+        messages.success(request, f'Changed {updated} transactions to {new_type}.')
+    return bulk_redirect(request)
+
+@login_required
+@require_POST
+def bulk_delete(request):
+    selection = bulk_selection(request)
+    if selection is not None:
+        deleted = delete_transactions(request.user, selection)
+        messages.success(request, f'Deleted {deleted} transactions.')
+    return bulk_redirect(request)
+
 @login_required
 def add_category(request):
     if request.method == 'POST':
@@ -351,13 +489,40 @@ def add_category(request):
         if form.is_valid():
             category = form.save(commit=False)
             category.user = request.user
-            category.save()
-            messages.success(request, 'Category added successfully!')
-            return redirect('dashboard')
+            # The form leaves out ``user``, so the unique constraint is checked here
+            if Category.objects.filter(
+                user=request.user, name=category.name, category_type=category.category_type
+            ).exists():
+                form.add_error('name', 'You already have a category with this name.')
+            else:
+                category.save()
+                messages.success(request, 'Category added successfully!')
+                return redirect('dashboard')
     else:
         form = CategoryForm()
     return render(request, 'tracker/add_category.html', {'form': form})
 
+@staff_member_required
+def cache_statistics(request):
+    return JsonResponse(cache_stats())
+
+@staff_member_required
+def profiling_report(request):
+    if request.method == 'POST':
+        reset_profiles()
+        messages.success(request, 'Profiling data cleared.')
+        return redirect('profiling_report')
+    
+    report = profile_report()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report)
+    
+    context = {
+        'enabled': settings.TRACKER_PROFILING,
+        'report': sorted(report.items(), key=lambda item: item[1]['wall_ms']['p95'], reverse=True),
+    }
+    return render(request, 'tracker/profiling.html', context)
+
 def logout_view(request):
     auth_logout(request)
     messages.success(request, 'You have been logged out successfully!')